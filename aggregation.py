@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+
+# Comment length weights
+def comment_weights(cleaned_comments):
+    """
+    Returns the word count of each cleaned comment; longer comments weigh more.
+    Categorical (interned) comments are counted once per distinct string.
+    """
+    if isinstance(cleaned_comments.dtype, pd.CategoricalDtype):
+        counts = cleaned_comments.cat.categories.astype(str).str.split().str.len().to_numpy()
+        codes = cleaned_comments.cat.codes.to_numpy()
+        weights = np.where(codes >= 0, counts[codes] if len(counts) else 0, 0)
+        return pd.Series(weights, index=cleaned_comments.index, dtype='int64')
+    return cleaned_comments.fillna("").astype(str).str.split().str.len()
+
+# Aggregate sentiment scores
+def aggregate_scores(data, with_stats=False, duplicates="count", max_duplicates=1):
+    """
+    Groups comments by media_id and calculates a weighted average of sentiment scores.
+    Longer comments have higher weights; posts whose comments carry no weight score 0.
+    All posts are reduced in one bincount pass instead of a Python loop over groups.
+    With with_stats=True the result also carries Comment_Count, Positive_Share,
+    Neutral_Share, Negative_Share and Score_Variance per post.
+    Also accepts compact frames (see frames.compact_frame): categorical columns are left
+    as they are, and without Cleaned_Comment the stored Weight column is used.
+    duplicates decides how near-duplicate comments (Cluster_Id, see dedup.py) count:
+    "count" weighs each comment on its own; "cap" lets each cluster contribute at
+    most max_duplicates comments' worth of weight per post. Frames without a
+    Cluster_Id column are aggregated the same either way.
+    """
+    if duplicates not in ("count", "cap"):
+        raise ValueError(f"duplicates must be 'count' or 'cap', got {duplicates!r}")
+    if 'Cleaned_Comment' in data.columns:
+        if not isinstance(data['Cleaned_Comment'].dtype, pd.CategoricalDtype):
+            data['Cleaned_Comment'] = data['Cleaned_Comment'].fillna("").astype(str)
+        data['Weight'] = comment_weights(data['Cleaned_Comment'])
+
+    codes, media_ids = pd.factorize(data['media_id'], sort=True)
+    keep = codes >= 0  # groupby semantics: comments without a media_id are dropped
+    codes = codes[keep]
+    n = len(media_ids)
+    scores = data['Sentiment_Score'].to_numpy(dtype=float)[keep]
+    weights = data['Weight'].to_numpy(dtype=float)[keep]
+    if duplicates == "cap" and 'Cluster_Id' in data.columns and len(codes):
+        # Comments of one cluster on one post share max_duplicates comments' weight
+        pairs, _ = pd.factorize(codes.astype(np.int64) * (int(data['Cluster_Id'].max()) + 1)
+                                + data['Cluster_Id'].to_numpy(dtype=np.int64)[keep])
+        copies = np.bincount(pairs)[pairs]
+        weights = weights * np.minimum(1.0, max_duplicates / copies)
+
+    total_weighted_score = np.bincount(codes, weights=scores * weights, minlength=n)
+    total_weight = np.bincount(codes, weights=weights, minlength=n)
+    aggregate = np.divide(
+        total_weighted_score, total_weight, out=np.zeros(n), where=total_weight > 0
+    )
+    result = pd.DataFrame({'media_id': np.asarray(media_ids), 'Aggregate_Score': aggregate})
+    if not with_stats:
+        return result
+
+    counts = np.bincount(codes, minlength=n)
+    safe_counts = np.maximum(counts, 1)
+    classes = data['Sentiment_Class'].astype(str).to_numpy()[keep]
+    for label in ('positive', 'neutral', 'negative'):
+        matches = np.bincount(codes, weights=(classes == label), minlength=n)
+        result[f'{label.capitalize()}_Share'] = matches / safe_counts
+    mean = np.bincount(codes, weights=scores, minlength=n) / safe_counts
+    mean_square = np.bincount(codes, weights=scores * scores, minlength=n) / safe_counts
+    result.insert(2, 'Comment_Count', counts)
+    result['Score_Variance'] = np.maximum(mean_square - mean * mean, 0.0)
+    return result
+
+
+# Running length-weighted sentiment aggregate per post
+class RunningAggregate:
+    """
+    Accumulates per-media_id weighted score sums chunk by chunk, so the final
+    aggregate never needs the full comment frame in memory.
+    Weights follow aggregate_scores: the word count of Cleaned_Comment.
+    """
+
+    def __init__(self):
+        self._weighted = {}
+        self._weights = {}
+
+    def update(self, data):
+        """
+        Folds a processed chunk (media_id, Cleaned_Comment, Sentiment_Score) into the totals.
+        """
+        weights = comment_weights(data['Cleaned_Comment'])
+        weighted = (data['Sentiment_Score'] * weights).groupby(data['media_id']).sum()
+        totals = weights.groupby(data['media_id']).sum()
+        for media_id, value in weighted.items():
+            self._weighted[media_id] = self._weighted.get(media_id, 0.0) + value
+            self._weights[media_id] = self._weights.get(media_id, 0) + totals[media_id]
+
+    def result(self):
+        """
+        Returns the aggregate in the aggregate_scores layout (media_id, Aggregate_Score).
+        Posts whose comments carry no weight score 0.
+        """
+        media_ids = sorted(self._weighted)
+        scores = [
+            self._weighted[media_id] / self._weights[media_id] if self._weights[media_id] > 0 else 0
+            for media_id in media_ids
+        ]
+        return pd.DataFrame({'media_id': media_ids, 'Aggregate_Score': scores})
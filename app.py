@@ -1,72 +1,408 @@
-from flask import render_template, Flask, request, redirect, url_for
-from instagrapi import Client
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.offsetbox import OffsetImage, AnnotationBbox
-import requests
-from io import BytesIO
-from extract import insta_login, getUserId, returnUserMedia, returnUserCommentsText, exportToCSV
-from senti_analysis import process_dataset
-from result1 import aggregate_scores, find_top_and_worst_posts, plot_graph_with_thumbnails, save_images_to_local_via_media_id
-from prompt import give_prediction_on_the_next_post
-
-
-app = Flask(__name__)
-
-@app.route('/')
-def login():    
-    return render_template('login.html')
-
-@app.route('/analyze' , methods=['POST'])
-def analyze():
-    username = request.form.get('username')
-    password = request.form.get('password')
-    cl = insta_login(username, password)
-    user_id = getUserId(cl,username)
-    media_ids = returnUserMedia(user_id,15,cl)
-    comments_data = returnUserCommentsText(cl,media_ids)
-    exportToCSV(comments_data)
-    print("Comments exported to comments_export.csv")
-    
-    #sentiment analysis
-    file_path = 'comments_export.csv'
-    data = process_dataset(file_path)
-    print(data)
-    print("Exporting processed data to CSV...")
-    csv_file_path = "processed_comments.csv"
-
-    # Save the DataFrame directly to CSV
-    data.to_csv(csv_file_path, index=False, encoding='utf-8')
-    print(f"Data exported to {csv_file_path}")
-    
-    #result
-    data = pd.read_csv('processed_comments.csv')
-
-   
-    aggregated_data = aggregate_scores(data)
-
-    # Find the top 3 and worst 3 posts
-    top_3, worst_3 = find_top_and_worst_posts(aggregated_data)
-    
-    print("Saving top 3 thumbnails to local...")
-    media_ids = []
-    for media_data in top_3.to_numpy():
-        media_ids.append(media_data[0])
-        
-    print(media_ids)
-    save_images_to_local_via_media_id(cl, media_ids)
-
-    print("\nTop 3 Posts:")
-    print(top_3)
-    print("\nWorst 3 Posts:")
-    print(worst_3)
-    plot_graph_with_thumbnails(aggregated_data, cl)
-    prediction_for_next_post = give_prediction_on_the_next_post()
-
-    # Plot Post IDs vs Sentiment Scores with thumbnails
-    # plot_graph_with_thumbnails(aggregated_data, cl)
-    
-    return render_template('analysis.html', username=username, prediction_post_text = prediction_for_next_post)
-
-if __name__ == '__main__':
-    app.run(debug=True)
+from flask import render_template, Flask, request, redirect, url_for, Response, abort, jsonify, send_from_directory, make_response
+from markupsafe import escape
+from jinja2 import TemplateNotFound
+from instagrapi import Client
+import pandas as pd
+import requests
+from io import BytesIO
+import hashlib
+import os
+import secrets
+import threading
+import time
+from extract import ClientPool, getUserId, returnUserMedia, returnUserMediaObjects, returnUserCommentsText, commentsToFrame
+from senti_analysis import process_dataset, PIPELINE_VERSION, warm_up
+from score_cache import ScoreCache
+from comment_store import CommentStore, sync_comments
+from result1 import aggregate_scores, find_top_and_worst_posts, plot_graph_with_thumbnails, save_images_to_local_via_media_id, save_graph_series
+from prompt import start_prediction, wait_for_prediction, FALLBACK_TEXT
+from thumbnails import ThumbnailCache
+from persistence import save_frame_async, load_frame
+from frames import compact_frame
+from dedup import mark_duplicates
+from jobs import JobQueue
+from metrics import render_prometheus
+from live import LiveWatcher, event_stream
+from results import ResultStore, result_version
+
+
+app = Flask(__name__)
+score_cache = ScoreCache(version=PIPELINE_VERSION)
+
+# Comment ingestion: parallel media fetches, capped at a request rate Instagram tolerates
+COMMENT_FETCH_CONCURRENCY = 4
+COMMENT_FETCH_RATE = 5
+
+# Keep scored comments between runs and only fetch/score what changed
+INCREMENTAL_SYNC = True
+comment_store = CommentStore()
+
+# Write the graph as a JSON series for client-side drawing instead of rendering a PNG
+CLIENT_SIDE_GRAPH = False
+
+# Frames are passed in memory; these copies are written in the background for export
+PERSIST_FRAMES = True
+
+# Group near-duplicate comments (promo floods, bot comments) into clusters. Every
+# comment is still scored on its own text; identical texts are scored once.
+# DUPLICATE_MODE "count" weighs every comment as before; "cap" lets each cluster
+# count as at most one comment per post, which changes post scores
+DEDUP_COMMENTS = True
+DUPLICATE_MODE = "count"
+
+# Keep processed frames in the compact layout (categoricals, float32 scores); the
+# comment text is interned rather than dropped because the CSV export needs it
+COMPACT_FRAMES = True
+COMPACT_TEXT = "intern"
+
+# Analyses run in the background, each in its own workspace under jobs/
+ANALYSIS_WORKERS = 4
+RESULT_POLL_SECONDS = 2
+# Keep every span of each job for /jobs/<job_id>/trace
+TRACE_JOBS = True
+job_queue = JobQueue(workers=ANALYSIS_WORKERS, trace=TRACE_JOBS)
+
+# Logged-in Instagram clients, reused across requests for the same account
+client_pool = ClientPool()
+
+# Model used for next-post predictions; None means the default Gemini backend
+prediction_backend = None
+
+# Publish finished results as immutable versions keyed by a hash of the account's
+# scores; an unchanged account reuses its published graph, images and prediction
+VERSION_RESULTS = True
+# Browser cache lifetime of content-hashed result files, in seconds
+RESULT_FILE_MAX_AGE = 365 * 24 * 3600
+result_store = ResultStore()
+
+# Live-watch mode: rolling sentiment of watched posts, streamed over server-sent events
+LIVE_POSTS = 5
+live_watcher = LiveWatcher(cache=score_cache)
+# Live routes other than /live/watch take the token /live/watch hands out, one per
+# account, and only see or stop the posts that account watches
+live_tokens = {}  # token -> username
+_live_tokens_lock = threading.Lock()
+
+@app.route('/')
+def login():    
+    return render_template('login.html')
+
+def run_analysis(job, username, password):
+    """
+    Runs the whole analysis for one account inside job.workspace and returns the
+    values the results page needs.
+    """
+    with job.stage("login"):
+        client_pool.get(username, password)
+
+    def ingest(cl):
+        # Every Instagram call runs in here: a stale session fails on one of them and
+        # client_pool.run then logs in again and repeats the stages
+        user_id = getUserId(cl, username)
+        if INCREMENTAL_SYNC:
+            with job.stage("media_listing") as stage:
+                medias = returnUserMediaObjects(user_id,15,cl)
+                stage.items = len(medias)
+            with job.stage("comment_sync") as stage:
+                data = sync_comments(cl, medias, comment_store, cache=score_cache,
+                                     concurrency=COMMENT_FETCH_CONCURRENCY, rate_limit=COMMENT_FETCH_RATE)
+                stage.items = len(data)
+            return cl, data
+        with job.stage("media_listing") as stage:
+            media_ids = returnUserMedia(user_id,15,cl)
+            stage.items = len(media_ids)
+        with job.stage("comment_fetch") as stage:
+            comments_data = returnUserCommentsText(cl,media_ids, concurrency=COMMENT_FETCH_CONCURRENCY, rate_limit=COMMENT_FETCH_RATE)
+            comments = commentsToFrame(comments_data)
+            stage.items = len(comments)
+        return cl, comments
+
+    cl, frame = client_pool.run(username, password, ingest)
+    if INCREMENTAL_SYNC:
+        data = frame
+        # The store holds every current comment of the posts, so the raw export is
+        # the same (media_id, comment) frame a full fetch would have produced
+        if PERSIST_FRAMES:
+            save_frame_async(data[['media_id', 'comment']], job.path("comments_export"))
+    else:
+        comments = frame
+        if PERSIST_FRAMES:
+            save_frame_async(comments, job.path("comments_export"))
+
+        #sentiment analysis
+        with job.stage("process_dataset") as stage:
+            data = process_dataset(comments, cache=score_cache, dedup=DEDUP_COMMENTS)
+            stage.items = len(data)
+    if DUPLICATE_MODE == "cap" and 'Cluster_Id' not in data.columns:
+        with job.stage("dedup") as stage:
+            data = mark_duplicates(data)
+            stage.items = len(data)
+    if COMPACT_FRAMES:
+        data = compact_frame(data, COMPACT_TEXT)
+    print(data)
+    if PERSIST_FRAMES:
+        save_frame_async(data, job.path("processed_comments"))
+
+    #result
+    with job.stage("aggregation") as stage:
+        aggregated_data = aggregate_scores(data, duplicates=DUPLICATE_MODE)
+        stage.items = len(aggregated_data)
+
+        # Find the top 3 and worst 3 posts
+        top_3, worst_3 = find_top_and_worst_posts(aggregated_data)
+
+    version = result_version(username, aggregated_data, PIPELINE_VERSION, DUPLICATE_MODE, CLIENT_SIDE_GRAPH)
+    if VERSION_RESULTS:
+        published = result_store.get(version)
+        if published is not None:
+            print("Scores unchanged, reusing published results...")
+            result_store.point(username, version)
+            return dict(published['values'], version=version)
+    
+    print("Saving top 3 thumbnails to local...")
+    media_ids = []
+    for media_data in top_3.to_numpy():
+        media_ids.append(media_data[0])
+        
+    print(media_ids)
+    with job.stage("thumbnails") as stage:
+        stage.items = len(media_ids)
+        thumbnails = ThumbnailCache(cl)
+        save_images_to_local_via_media_id(cl, media_ids, thumbnails, job.workspace)
+
+    # The prediction only needs the top images, so it runs while the graph is drawn
+    prediction = start_prediction(job.workspace, prediction_backend)
+    prediction_started = time.monotonic()
+
+    print("\nTop 3 Posts:")
+    print(top_3)
+    print("\nWorst 3 Posts:")
+    print(worst_3)
+    with job.stage("plotting"):
+        if CLIENT_SIDE_GRAPH:
+            save_graph_series(aggregated_data, job.path("graph_series.json"), thumbnails)
+        else:
+            plot_graph_with_thumbnails(aggregated_data, cl, thumbnails, job.path("graph_with_thumbnails.png"))
+    with job.stage("prediction"):
+        prediction_for_next_post = wait_for_prediction(prediction, started=prediction_started)
+
+    result = {'username': username, 'prediction_post_text': prediction_for_next_post}
+    # A fallback prediction is not published, so the next run asks the model again
+    if VERSION_RESULTS and prediction_for_next_post != FALLBACK_TEXT:
+        result_store.publish(username, version, job.workspace, result, job_id=job.id)
+        result['version'] = version
+    return result
+
+@app.route('/analyze' , methods=['POST'])
+def analyze():
+    """
+    Queues an analysis job and returns its ID right away.
+    JSON clients get the job ID and URLs; browsers are sent to the results page.
+    """
+    username = request.form.get('username')
+    password = request.form.get('password')
+    job = job_queue.submit(run_analysis, username, password)
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(job_id=job.id, status_url=url_for('job_status', job_id=job.id),
+                       result_url=url_for('job_result', job_id=job.id)), 202
+    return redirect(url_for('job_result', job_id=job.id), code=303)
+
+def get_job_or_404(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        abort(404)
+    return job
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """
+    Reports the job's status, current stage and per-stage timings.
+    """
+    return jsonify(get_job_or_404(job_id).to_dict())
+
+@app.route('/jobs/<job_id>/trace')
+def job_trace(job_id):
+    """
+    Dumps every span the job recorded (stages and the helpers inside them).
+    """
+    job = get_job_or_404(job_id)
+    if job.trace is None:
+        abort(404)
+    return jsonify(job_id=job.id, status=job.status, spans=list(job.trace))
+
+@app.route('/metrics')
+def metrics():
+    """
+    Prometheus text exposition of per-stage latency histograms, item and error counts.
+    """
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    """
+    Serves the analysis page once the job is done (redirecting to its published
+    version, if any); until then a page that polls again.
+    """
+    job = get_job_or_404(job_id)
+    if job.status == 'failed':
+        return f"Analysis failed: {escape(job.error)}", 500
+    if job.status != 'done':
+        stage = escape(job.stage_name or job.status)
+        return (f'<meta http-equiv="refresh" content="{RESULT_POLL_SECONDS}">'
+                f'<p>Analysis in progress ({stage})...</p>', 202)
+    if job.result.get('version'):
+        return redirect(url_for('version_result', version=job.result['version']), code=303)
+    return render_template('analysis.html', job_id=job.id,
+                           graph_url=url_for('job_file', job_id=job.id, filename='graph_with_thumbnails.png'),
+                           top_urls=[url_for('job_file', job_id=job.id, filename=f'top_{i}.jpg') for i in (1, 2, 3)],
+                           **job.result)
+
+# Function to build the ETag of a results page
+def page_etag(version, template='analysis.html'):
+    """
+    Combines the result version with a digest of the page template, so editing the
+    template changes the ETag even though the results did not.
+    """
+    try:
+        source = app.jinja_env.loader.get_source(app.jinja_env, template)[0]
+    except TemplateNotFound:
+        source = ""
+    return f"{version}.{hashlib.sha256(source.encode('utf-8')).hexdigest()[:12]}"
+
+@app.route('/results/<version>')
+def version_result(version):
+    """
+    Serves a published result version. The version is a content hash, so together
+    with the template digest (see page_etag) it makes a strong ETag: a repeat view
+    of an unchanged account gets a 304.
+    """
+    manifest = result_store.get(version)
+    if manifest is None:
+        abort(404)
+    etag = page_etag(version)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        files = manifest['files']
+        graph = files.get('graph_with_thumbnails.png')
+        response = make_response(render_template(
+            'analysis.html', job_id=manifest['job_id'], version=version,
+            graph_url=url_for('version_file', version=version, filename=graph) if graph else None,
+            top_urls=[url_for('version_file', version=version, filename=files[f'top_{i}.jpg'])
+                      for i in (1, 2, 3) if f'top_{i}.jpg' in files],
+            **manifest['values']))
+    response.set_etag(etag)
+    # Revalidate every time: the ETag check is cheap and picks up template changes
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/results/<version>/files/<filename>')
+def version_file(version, filename):
+    """
+    Serves a content-hashed file of a result version with a long-lived cache header.
+    """
+    manifest = result_store.get(version)
+    if manifest is None or filename not in manifest['files'].values():
+        abort(404)
+    response = send_from_directory(os.path.abspath(result_store.path(version)), filename,
+                                   max_age=RESULT_FILE_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/jobs/<job_id>/files/<path:filename>')
+def job_file(job_id, filename):
+    """
+    Serves a file (graph, thumbnails) from the job's workspace.
+    """
+    return send_from_directory(os.path.abspath(get_job_or_404(job_id).workspace), filename)
+
+@app.route('/jobs/<job_id>/export/<name>.csv')
+def export_csv(job_id, name):
+    """
+    Serves the job's persisted comments_export or processed_comments frame as CSV.
+    """
+    if name not in ('comments_export', 'processed_comments'):
+        abort(404)
+    data = load_frame(get_job_or_404(job_id).path(name))
+    if data is None:
+        abort(404)
+    return Response(data.to_csv(index=False), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={name}.csv'})
+
+@app.route('/live/watch', methods=['POST'])
+def live_watch():
+    """
+    Starts watching posts for new comments. Takes username and password, plus
+    optional media_id values (default: the account's LIVE_POSTS most recent posts).
+    """
+    username = request.form.get('username')
+    password = request.form.get('password')
+    media_ids = request.form.getlist('media_id')
+    try:
+        cl, media_ids = client_pool.run(username, password, lambda client: (
+            client, media_ids or returnUserMedia(getUserId(client, username), LIVE_POSTS, client)))
+    except Exception as e:
+        print(f"Error starting live watch for {username}: {e}")
+        return jsonify(error=str(e)), 502
+    for media_id in media_ids:
+        live_watcher.watch(cl, media_id, owner=username)
+    token = live_token(username)
+    return jsonify(watching=media_ids, token=token,
+                   stream_url=url_for('live_stream', media_id=media_ids, token=token)), 202
+
+# Function to get the live token of an account
+def live_token(username):
+    with _live_tokens_lock:
+        for token, owner in live_tokens.items():
+            if owner == username:
+                return token
+        token = secrets.token_urlsafe(32)
+        live_tokens[token] = username
+        return token
+
+# Function to resolve the account of a live request, or abort with 401
+def live_owner():
+    token = request.values.get('token', '')
+    with _live_tokens_lock:
+        for known, owner in live_tokens.items():
+            if secrets.compare_digest(known, token):
+                return owner
+    abort(401)
+
+@app.route('/live/unwatch', methods=['POST'])
+def live_unwatch():
+    """
+    Stops watching the given media_id values for the account of token.
+    """
+    owner = live_owner()
+    for media_id in request.form.getlist('media_id'):
+        live_watcher.unwatch(media_id, owner=owner)
+    return jsonify(watching=live_watcher.watched(owner))
+
+@app.route('/live')
+def live_snapshot():
+    """
+    Current rolling aggregate of every post watched by the account of token.
+    """
+    owner = live_owner()
+    return jsonify([live_watcher.aggregate.snapshot(media_id) for media_id in live_watcher.watched(owner)])
+
+@app.route('/live/stream')
+def live_stream():
+    """
+    Server-sent events: an 'update' event with the rolling aggregate of a post each
+    time it changes, for the posts watched by the account of token. Limit it to
+    some of them with media_id query parameters.
+    """
+    watched = live_watcher.watched(live_owner())
+    requested = request.args.getlist('media_id')
+    media_ids = [media_id for media_id in requested if media_id in watched] if requested else watched
+    if not media_ids:
+        abort(404)
+    return Response(event_stream(live_watcher, media_ids), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+if __name__ == '__main__':
+    # Load NLTK data and the VADER lexicon once, before the first request arrives
+    print(f"Startup timings (s): {warm_up()}")
+    app.run(debug=True)
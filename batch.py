@@ -0,0 +1,168 @@
+import argparse
+import csv
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from aggregation import aggregate_scores
+from comment_store import CommentStore, sync_comments
+from extract import ClientPool, getUserId, returnUserMediaObjects
+from frames import compact_frame
+from metrics import span
+from persistence import PERSIST_FORMAT, save_frame
+from ranking import TopK
+from score_cache import ScoreCache
+from senti_analysis import PIPELINE_VERSION, warm_up
+
+# Accounts analysed at once; each one also runs FETCH_CONCURRENCY comment fetches
+BATCH_WORKERS = 4
+FETCH_CONCURRENCY = 2
+FETCH_RATE = 5
+
+POSTS_PER_ACCOUNT = 15
+TOP_K = 3
+DEFAULT_OUTPUT = "batch_report"
+
+
+# Read the account list
+def load_accounts(path):
+    """
+    Returns [(username, password)] from a CSV file with username and password columns.
+    """
+    with open(path, newline='', encoding='utf-8') as file:
+        return [(row['username'], row['password']) for row in csv.DictReader(file)]
+
+# Running best/worst rankings across a batch
+class BatchRanking:
+    """
+    Collects each account's aggregated posts as it finishes and keeps the k best and
+    worst posts per account and across all accounts in TopK heaps.
+    """
+
+    def __init__(self, k=TOP_K):
+        self.k = k
+        self.best = TopK(k)
+        self.worst = TopK(k, largest=False)
+        self.account_best = {}
+        self.account_worst = {}
+        self.frames = []
+
+    def add(self, username, aggregated):
+        best, worst = TopK(self.k), TopK(self.k, largest=False)
+        for media_id, score in zip(aggregated['media_id'], aggregated['Aggregate_Score']):
+            best.push(score, media_id)
+            worst.push(score, media_id)
+            self.best.push(score, (username, media_id))
+            self.worst.push(score, (username, media_id))
+        self.account_best[username] = best
+        self.account_worst[username] = worst
+        self.frames.append(aggregated)
+
+    def report(self):
+        """
+        Returns one frame with every post of every account, plus rank columns:
+        Account_Best_Rank / Account_Worst_Rank within the account and Best_Rank /
+        Worst_Rank across the batch (1 is the extreme, empty outside the top k).
+        """
+        if not self.frames:
+            return pd.DataFrame(columns=['account', 'media_id', 'Aggregate_Score'])
+        data = pd.concat(self.frames, ignore_index=True)
+        keys = list(zip(data['account'], data['media_id']))
+
+        def ranks(rankings):
+            positions = {}
+            for username, ranking in rankings.items():
+                for rank, (_, media_id) in enumerate(ranking.items(), start=1):
+                    positions[(username, media_id)] = rank
+            return pd.array([positions.get(key) for key in keys], dtype='Int32')
+
+        def global_ranks(ranking):
+            positions = {key: rank for rank, (_, key) in enumerate(ranking.items(), start=1)}
+            return pd.array([positions.get(key) for key in keys], dtype='Int32')
+
+        data['Account_Best_Rank'] = ranks(self.account_best)
+        data['Account_Worst_Rank'] = ranks(self.account_worst)
+        data['Best_Rank'] = global_ranks(self.best)
+        data['Worst_Rank'] = global_ranks(self.worst)
+        return data
+
+# Function to run ingestion, scoring and aggregation for one account
+def analyze_account(username, password, client_pool, store, cache, posts=POSTS_PER_ACCOUNT,
+                    concurrency=FETCH_CONCURRENCY, rate_limit=FETCH_RATE):
+    """
+    Returns the account's per-post aggregate (with stats) with an account column in front.
+    """
+    with span("batch_account") as current:
+        # The Instagram calls run inside client_pool.run, so an expired session logs in again
+        data = client_pool.run(username, password, lambda cl: sync_comments(
+            cl, returnUserMediaObjects(getUserId(cl, username), posts, cl), store,
+            cache=cache, concurrency=concurrency, rate_limit=rate_limit))
+        # Aggregation only needs the scores and word counts, so the text is dropped right away
+        data = compact_frame(data, "drop")
+        aggregated = aggregate_scores(data, with_stats=True)
+        aggregated.insert(0, 'account', username)
+        current.items = len(data)
+    return aggregated
+
+# Function to analyze many accounts
+def run_batch(accounts, workers=BATCH_WORKERS, k=TOP_K, posts=POSTS_PER_ACCOUNT, output=DEFAULT_OUTPUT,
+              fmt=PERSIST_FORMAT, client_pool=None, store=None, cache=None,
+              concurrency=FETCH_CONCURRENCY, rate_limit=FETCH_RATE):
+    """
+    Analyzes [(username, password)] with at most `workers` accounts in flight and
+    writes one consolidated report (see BatchRanking.report) to output.
+    Returns {'report', 'best', 'worst', 'errors', 'path'}; best and worst hold
+    (score, (account, media_id)) pairs. A failing account is reported in errors
+    and does not stop the batch.
+    """
+    client_pool = client_pool or ClientPool()
+    store = store or CommentStore()
+    cache = cache or ScoreCache(version=PIPELINE_VERSION)
+    ranking = BatchRanking(k)
+    errors = {}
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+        futures = {
+            pool.submit(analyze_account, username, password, client_pool, store, cache,
+                        posts, concurrency, rate_limit): username
+            for username, password in accounts
+        }
+        # Rankings are updated as accounts finish, in this thread only
+        for future in as_completed(futures):
+            username = futures[future]
+            try:
+                ranking.add(username, future.result())
+                print(f"Analyzed {username}")
+            except Exception as e:
+                errors[username] = f"{type(e).__name__}: {e}"
+                print(f"Error analyzing {username}: {e}")
+
+    report = ranking.report()
+    path = save_frame(report, output, fmt) if output else None
+    if path:
+        print(f"Batch report for {len(accounts) - len(errors)} accounts written to {path}")
+    return {'report': report, 'best': ranking.best.items(), 'worst': ranking.worst.items(),
+            'errors': errors, 'path': path}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sentiment analysis across many Instagram accounts")
+    parser.add_argument('accounts', help="CSV file with username and password columns")
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS, help="accounts analysed at once")
+    parser.add_argument('--top', type=int, default=TOP_K, help="best/worst posts to rank")
+    parser.add_argument('--posts', type=int, default=POSTS_PER_ACCOUNT, help="recent posts per account")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="report path, without extension")
+    parser.add_argument('--format', default=PERSIST_FORMAT, choices=['parquet', 'feather', 'csv'])
+    args = parser.parse_args(argv)
+
+    warm_up()
+    result = run_batch(load_accounts(args.accounts), workers=args.workers, k=args.top,
+                       posts=args.posts, output=args.output, fmt=args.format)
+    for title, ranking in (("Best posts", result['best']), ("Worst posts", result['worst'])):
+        print(f"\n{title}:")
+        for score, (username, media_id) in ranking:
+            print(f"  {username:<20} {media_id:<24} {score:+.4f}")
+    return 1 if result['errors'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import senti_analysis
+from aggregation import aggregate_scores
+
+DATASETS = ["test.csv", "idktest.csv"]
+SYNTHETIC_SIZES = [100000, 1000000]
+
+# Share of synthetic comments carrying at least one emoji / hashtag
+EMOJI_RATE = 0.4
+HASHTAG_RATE = 0.15
+EMOJIS = ["🔥", "❤️", "😍", "😂", "🙌", "👏", "😡", "💯", "✨", "😭", "👍", "🥰"]
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+DEFAULT_THRESHOLD = 0.10
+
+
+# Load the bundled labelled datasets
+def load_texts(path):
+    """
+    Returns the text column of a bundled (tab-separated) dataset as a list of strings.
+    """
+    data = pd.read_csv(path, sep='\t', encoding='utf-8', encoding_errors='replace')
+    return data['text'].fillna('').astype(str).tolist()
+
+# Build a synthetic corpus of a given size
+def synthetic_comments(n, vocabulary, seed=0):
+    """
+    Generates n short comments from the bundled vocabulary, with emoji and hashtag
+    density close to Instagram comment sections (and some exact repeats).
+    """
+    rng = random.Random(seed)
+    comments = []
+    for _ in range(n):
+        if comments and rng.random() < 0.1:
+            comments.append(rng.choice(comments))
+            continue
+        words = rng.choices(vocabulary, k=rng.randint(1, 14))
+        if rng.random() < HASHTAG_RATE:
+            words.append("#" + rng.choice(vocabulary))
+        if rng.random() < EMOJI_RATE:
+            words.append("".join(rng.choices(EMOJIS, k=rng.randint(1, 4))))
+        comments.append(" ".join(words))
+    return comments
+
+def _time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        # Every run starts cold, so memos filled by an earlier run or corpus do not count
+        senti_analysis.clear_memos()
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+# Benchmark every stage on one corpus
+def benchmark_stages(texts, repeat=1):
+    """
+    Times each pipeline stage on texts, feeding every stage the previous stage's output
+    (prepared outside the timed region). Returns {stage: comments per second}.
+    """
+    n = len(texts)
+    cleaned = [senti_analysis.clean_text(text) for text in texts]
+    negated = [senti_analysis.handle_negations(text) for text in cleaned]
+    processed = [senti_analysis.process_tokens(text) for text in negated]
+    scored = pd.DataFrame({
+        'media_id': np.arange(n) % 1000,
+        'Cleaned_Comment': processed,
+        'Sentiment_Score': np.random.default_rng(0).uniform(-1, 1, n),
+    })
+
+    stages = {
+        'clean_text': lambda: [senti_analysis.clean_text(text) for text in texts],
+        'clean_batch': lambda: senti_analysis.clean_batch(texts),
+        'handle_negations': lambda: [senti_analysis.handle_negations(text) for text in cleaned],
+        'process_tokens': lambda: [senti_analysis.process_tokens(text) for text in negated],
+        'preprocess_text': lambda: [senti_analysis.preprocess_text(text) for text in texts],
+        'preprocess_batch': lambda: senti_analysis.preprocess_batch(texts),
+        'analyze_sentiment': lambda: [senti_analysis.analyze_sentiment(text) for text in processed],
+        'analyze_sentiment_batch': lambda: senti_analysis.analyze_sentiment_batch(processed),
+        'aggregate_scores': lambda: aggregate_scores(scored.copy()),
+    }
+    results = {}
+    for name, func in stages.items():
+        seconds = _time(func, repeat)
+        # A run too fast for the clock has no rate; None keeps the JSON standard
+        results[name] = n / seconds if seconds > 0 else None
+        if results[name] is None:
+            print(f"  {name:<20} {'too fast to time':>12}")
+        else:
+            print(f"  {name:<20} {results[name]:>12,.0f} comments/s")
+    return results
+
+# Run the whole suite
+def run_suite(datasets=DATASETS, sizes=SYNTHETIC_SIZES, repeat=1):
+    """
+    Benchmarks the bundled datasets and synthetic scale-ups; returns a JSON-ready dict.
+    """
+    senti_analysis.warm_up()
+    corpora = {path: load_texts(path) for path in datasets}
+    vocabulary = sorted({word for texts in corpora.values() for text in texts for word in text.split()})
+    for size in sizes:
+        corpora[f"synthetic_{size}"] = synthetic_comments(size, vocabulary)
+
+    results = {}
+    for name, texts in corpora.items():
+        print(f"{name} ({len(texts)} comments)")
+        results[name] = {'comments': len(texts), 'stages': benchmark_stages(texts, repeat)}
+    return {
+        'created_at': time.time(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'pipeline_version': senti_analysis.PIPELINE_VERSION,
+        'results': results,
+    }
+
+# Compare against a stored baseline
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Returns a list of regressions: stages whose throughput dropped by more than
+    threshold (a fraction) relative to the baseline on the same corpus.
+    """
+    regressions = []
+    for corpus, result in current['results'].items():
+        base_stages = baseline.get('results', {}).get(corpus, {}).get('stages', {})
+        for stage, rate in result['stages'].items():
+            base_rate = base_stages.get(stage)
+            if not base_rate or rate is None:
+                continue
+            change = rate / base_rate - 1
+            marker = "REGRESSION" if change < -threshold else ""
+            print(f"{corpus:<20} {stage:<20} {base_rate:>12,.0f} -> {rate:>12,.0f} ({change:+.1%}) {marker}")
+            if change < -threshold:
+                regressions.append({'corpus': corpus, 'stage': stage, 'baseline': base_rate,
+                                    'current': rate, 'change': change})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stage-level throughput benchmarks")
+    parser.add_argument('--sizes', type=int, nargs='*', default=SYNTHETIC_SIZES,
+                        help="synthetic corpus sizes (default: 100000 1000000)")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per stage; the best is kept")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="where to write the JSON results")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown fraction reported as a regression (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    current = run_suite(sizes=args.sizes, repeat=args.repeat)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(current, file, indent=2, allow_nan=False)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
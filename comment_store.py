@@ -0,0 +1,179 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from extract import TokenBucket, fetchMediaComments
+from senti_analysis import SENTIMENT_LABELS, score_comments, sentiment_codes
+from metrics import span
+
+# Extra newest comments read when only the count delta is fetched, in case some
+# arrived between listing the posts and fetching
+SYNC_FETCH_MARGIN = 5
+# A post is re-read in full at least this often, to catch deleted comments (a
+# deletion plus a new comment leaves the count unchanged)
+FULL_SYNC_SECONDS = 6 * 60 * 60
+
+# Local store of scored comments per post, with a sync watermark for each post
+class CommentStore:
+    """
+    SQLite store of every comment seen per media_id (id, text, timestamp and scores),
+    plus a per-post watermark: the newest comment timestamp, the post's comment count
+    at the last sync and the time of the last full sync. Classes are derived from the
+    stored scores on load, so they follow the current thresholds.
+    """
+
+    def __init__(self, path="comment_store.sqlite3"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS comments ("
+            "media_id TEXT, comment_id TEXT, comment TEXT, created_at REAL, "
+            "cleaned TEXT, score REAL, class TEXT, PRIMARY KEY (media_id, comment_id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS watermarks ("
+            "media_id TEXT PRIMARY KEY, last_created_at REAL, comment_count INTEGER, full_synced_at REAL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(watermarks)")}
+        if "full_synced_at" not in columns:
+            self._conn.execute("ALTER TABLE watermarks ADD COLUMN full_synced_at REAL")
+        self._conn.commit()
+
+    def watermark(self, media_id):
+        """
+        Returns (last_created_at, comment_count, full_synced_at) for a post, or None if
+        never synced.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT last_created_at, comment_count, full_synced_at FROM watermarks WHERE media_id = ?",
+                (str(media_id),),
+            ).fetchone()
+
+    def comment_ids(self, media_id):
+        with self._lock:
+            rows = self._conn.execute("SELECT comment_id FROM comments WHERE media_id = ?", (str(media_id),))
+            return {row[0] for row in rows}
+
+    def update(self, media_id, new_rows, removed_ids, comment_count, full_sync=False):
+        """
+        Inserts newly scored comments, drops deleted ones and advances the watermark.
+        new_rows are (comment_id, comment, created_at, cleaned, score, class) tuples.
+        full_sync marks that every comment of the post was just read.
+        """
+        media_id = str(media_id)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO comments VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(media_id, *row) for row in new_rows],
+            )
+            self._conn.executemany(
+                "DELETE FROM comments WHERE media_id = ? AND comment_id = ?",
+                [(media_id, comment_id) for comment_id in removed_ids],
+            )
+            (last_created_at,) = self._conn.execute(
+                "SELECT MAX(created_at) FROM comments WHERE media_id = ?", (media_id,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT INTO watermarks (media_id, last_created_at, comment_count, full_synced_at) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (media_id) DO UPDATE SET "
+                "last_created_at = excluded.last_created_at, comment_count = excluded.comment_count, "
+                "full_synced_at = COALESCE(excluded.full_synced_at, watermarks.full_synced_at)",
+                (media_id, last_created_at, comment_count, time.time() if full_sync else None),
+            )
+            self._conn.commit()
+
+    def load(self, media_ids):
+        """
+        Returns the stored comments of the given posts in the process_dataset layout.
+        """
+        media_ids = [str(media_id) for media_id in media_ids]
+        placeholders = ",".join("?" * len(media_ids))
+        with self._lock:
+            data = pd.read_sql_query(
+                "SELECT media_id, comment, cleaned AS Cleaned_Comment, score AS Sentiment_Score "
+                f"FROM comments WHERE media_id IN ({placeholders}) "
+                "ORDER BY media_id, created_at, comment_id",
+                self._conn, params=media_ids,
+            )
+        data['Sentiment_Class'] = SENTIMENT_LABELS[sentiment_codes(data['Sentiment_Score'].to_numpy())]
+        return data
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# Function to bring the store up to date for a set of posts
+def sync_comments(cl, medias, store, cache=None, concurrency=1, rate_limit=None):
+    """
+    Incrementally syncs comments for medias (objects with .id and .comment_count, as
+    returned by cl.user_medias) and returns all their stored comments, scored.
+    Posts whose comment count matches the watermark are not fetched at all. When the
+    count grew, only the newest (delta + SYNC_FETCH_MARGIN) comments are fetched; if
+    those do not reach back to a comment already stored, the post is read in full.
+    New posts, posts whose count dropped and posts not read in full for
+    FULL_SYNC_SECONDS are read in full, which is also when deleted comments are
+    removed. Only comments not already in the store are preprocessed and scored.
+    """
+    limiter = TokenBucket(rate_limit) if rate_limit else None
+    now = time.time()
+    plans = []  # (media, watermark, amount); amount 0 reads every comment
+    for media in medias:
+        count = getattr(media, 'comment_count', None)
+        watermark = store.watermark(media.id)
+        if watermark is None or watermark[2] is None or now - watermark[2] > FULL_SYNC_SECONDS:
+            plans.append((media, watermark, 0))
+        elif count is None or count < watermark[1]:
+            plans.append((media, watermark, 0))
+        elif count > watermark[1]:
+            plans.append((media, watermark, count - watermark[1] + SYNC_FETCH_MARGIN))
+    print(f"Syncing comments: {len(plans)} of {len(medias)} posts changed since last run "
+          f"({sum(1 for _, _, amount in plans if not amount)} read in full)")
+
+    def fetch(plan):
+        media, watermark, amount = plan
+        comments = fetchMediaComments(cl, media.id, limiter, amount=amount)
+        if amount:
+            # The newest comments must overlap what is stored, or some were missed
+            known = store.comment_ids(media.id)
+            last_created_at = watermark[0]
+            reached = any(
+                str(comment.pk) in known
+                or (last_created_at is not None and comment.created_at_utc is not None
+                    and comment.created_at_utc.timestamp() <= last_created_at)
+                for comment in comments
+            )
+            if not reached:
+                comments = fetchMediaComments(cl, media.id, limiter)
+                amount = 0
+        return media, comments, not amount
+
+    with span("comment_fetch", items=len(plans)):
+        if concurrency <= 1:
+            fetched = [fetch(plan) for plan in plans]
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                fetched = list(pool.map(fetch, plans))
+
+    new_total = 0
+    for media, comments, full_sync in fetched:
+        known = store.comment_ids(media.id)
+        seen = {str(comment.pk) for comment in comments}
+        new_comments = [comment for comment in comments if str(comment.pk) not in known]
+        new_rows = []
+        if new_comments:
+            cleaned, scores, classes = score_comments([comment.text for comment in new_comments], cache)
+            for comment, c, score, sentiment in zip(new_comments, cleaned, scores, classes):
+                created_at = comment.created_at_utc.timestamp() if comment.created_at_utc else None
+                new_rows.append((str(comment.pk), comment.text, created_at, c, float(score), sentiment))
+        # Only a full read shows which stored comments were deleted
+        removed = known - seen if full_sync else set()
+        store.update(media.id, new_rows, removed, getattr(media, 'comment_count', len(comments)), full_sync)
+        new_total += len(new_rows)
+    print(f"Scored {new_total} new comments")
+
+    return store.load([media.id for media in medias])
@@ -0,0 +1,142 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# MinHash / LSH settings: 8 bands of 4 rows find ~98% of pairs at 0.8 similarity;
+# candidates are then kept only above SIMILARITY_THRESHOLD
+NUM_PERM = 32
+BANDS = 8
+SHINGLE_SIZE = 4
+SIMILARITY_THRESHOLD = 0.8
+
+# Shingles hashed together against all permutations at once (a cache-sized block)
+_HASH_CHUNK = 1 << 15
+
+# Mentions and links differ between copies of the same promo
+_handles = re.compile(r"@\w+|https?://\S+|www\.\S+")
+# Punctuation, digits, whitespace, variation selectors and ZWJ carry no meaning for matching
+_noise = re.compile(r"[\x00-\x40\x5b-\x60\x7b-\x7f\s\ufe0e\ufe0f\u200d]+")
+# "🔥🔥" and "🔥", or "lolll" and "lol", are the same comment; letters collapse only
+# in runs of three or more, so doubled letters in words ("good" / "god") stay apart
+_repeats = re.compile(r"(\w)\1{2,}|(\W)\2+")
+
+_rng = np.random.default_rng(2024)
+_SEEDS = _rng.integers(1, 2 ** 32, size=NUM_PERM, dtype=np.uint32)
+_MULTIPLIERS = _rng.integers(1, 2 ** 32, size=NUM_PERM, dtype=np.uint32) | np.uint32(1)
+
+
+def _collapse_run(match):
+    return match.group(1) or match.group(2)
+
+# Normalized form used for matching
+def signature_text(text):
+    """
+    Lowercases text, drops mentions, links, punctuation, digits and whitespace, and
+    collapses runs of the same emoji (or of three or more of the same letter).
+    """
+    if not isinstance(text, str):
+        text = str(text)
+    return _repeats.sub(_collapse_run, _noise.sub("", _handles.sub("", text.lower())))
+
+def _shingle_hashes(keys, shingle_size):
+    # Hashes every character k-gram of every key in one vectorized pass; returns the
+    # hashes and the offset of each key's first shingle
+    padded = [key.ljust(shingle_size, "\0") for key in keys]
+    codes = np.frombuffer("".join(padded).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    lengths = np.fromiter((len(key) for key in padded), dtype=np.int64, count=len(padded))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    counts = lengths - shingle_size + 1
+
+    hashes = np.zeros(len(codes) - shingle_size + 1, dtype=np.uint64)
+    for offset in range(shingle_size):
+        hashes = hashes * np.uint64(0x100000001B3) + codes[offset:len(codes) - shingle_size + 1 + offset]
+    # Keep only the shingles that lie inside a single key
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    positions = np.arange(counts.sum()) + np.repeat(starts - offsets, counts)
+    # Fold to 32 bits; the per-permutation mixing below works on uint32
+    folded = (hashes[positions] * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)
+    return folded.astype(np.uint32), offsets
+
+# MinHash signatures
+def minhash_signatures(keys, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE):
+    """
+    Returns a (len(keys), num_perm) uint32 array: the MinHash signature of each key's
+    character shingles. Equal fractions of signature values estimate Jaccard similarity.
+    """
+    signatures = np.empty((len(keys), num_perm), dtype=np.uint32)
+    if not keys:
+        return signatures
+    hashes, offsets = _shingle_hashes(keys, shingle_size)
+    # Split on key boundaries so each chunk holds whole keys
+    marks = np.searchsorted(offsets, np.arange(_HASH_CHUNK, len(hashes), _HASH_CHUNK))
+    bounds = [0] + sorted(set(marks.tolist()) - {0, len(keys)}) + [len(keys)]
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        end = offsets[hi] if hi < len(keys) else len(hashes)
+        chunk = hashes[offsets[lo]:end]
+        local = offsets[lo:hi] - offsets[lo]
+        mixed = (chunk[None, :] ^ _SEEDS[:num_perm, None]) * _MULTIPLIERS[:num_perm, None]
+        mixed ^= mixed >> np.uint32(15)
+        signatures[lo:hi] = np.minimum.reduceat(mixed, local, axis=1).T
+    return signatures
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+# Cluster near-duplicate comments
+def near_duplicate_clusters(comments, threshold=SIMILARITY_THRESHOLD, bands=BANDS):
+    """
+    Groups comments that are identical after signature_text, or whose MinHash
+    signatures agree on at least `threshold` of their values (LSH banding finds the
+    candidates, so no pairwise comparison is needed).
+    Returns (cluster, representatives): the cluster number of each comment, numbered
+    in order of first appearance, and the position of the first comment of each cluster.
+    """
+    comments = pd.Series(comments, dtype=object)
+    codes, uniques = pd.factorize(comments, use_na_sentinel=False)
+    key_codes, keys = pd.factorize(pd.Series([signature_text(text) for text in uniques], dtype=object))
+    keys = [str(key) for key in keys]
+
+    signatures = minhash_signatures(keys)
+    parent = list(range(len(keys)))
+    rows = NUM_PERM // bands
+    positions = np.arange(len(keys))
+    for band in range(bands):
+        block = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+        band_hash = np.zeros(len(keys), dtype=np.uint64)
+        for column in block.T:
+            band_hash = band_hash * np.uint64(0x9E3779B97F4A7C15) + column
+        _, bucket = np.unique(band_hash, return_inverse=True)
+        first = np.full(bucket.max() + 1 if len(keys) else 0, len(keys))
+        np.minimum.at(first, bucket, positions)
+        root = first[bucket]
+        candidates = np.nonzero(root != positions)[0]
+        if not len(candidates):
+            continue
+        similar = (signatures[candidates] == signatures[root[candidates]]).mean(axis=1) >= threshold
+        for i in candidates[similar]:
+            a, b = _find(parent, int(i)), _find(parent, int(root[i]))
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+
+    key_roots = np.array([_find(parent, i) for i in range(len(keys))], dtype=np.int64)
+    row_roots = key_roots[key_codes][codes]
+    cluster, _ = pd.factorize(row_roots)
+    representatives = np.full(cluster.max() + 1 if len(cluster) else 0, len(cluster))
+    np.minimum.at(representatives, cluster, np.arange(len(cluster)))
+    return cluster, representatives
+
+# Label the duplicate clusters of a comment frame
+def mark_duplicates(data, threshold=SIMILARITY_THRESHOLD):
+    """
+    Adds Cluster_Id and Cluster_Size (comments in the cluster, across all posts) to a
+    frame with a comment column, for aggregate_scores(duplicates="cap"). Use it on
+    frames that were scored without process_dataset(dedup=True), e.g. from the CommentStore.
+    """
+    cluster, _ = near_duplicate_clusters(data['comment'], threshold)
+    data['Cluster_Id'] = cluster
+    data['Cluster_Size'] = np.bincount(cluster)[cluster] if len(cluster) else cluster
+    return data
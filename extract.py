@@ -1,56 +1,249 @@
-from instagrapi import Client
-import csv
-
-
-
-def insta_login(username, password):
-    print("Logging you in...")
-    cl = Client()
-    cl.login(username, password)
-    return cl
-
-def getUserId(cl,username):
-    print("Getting user id...")
-    user_id = cl.user_id_from_username("username")
-    return user_id
-
-def returnUserMedia(user_id,n,cl):
-    print("Getting user media...")
-    medias = cl.user_medias(user_id, n)
-    media_ids = [media.id for media in medias]
-    return media_ids
-
-def returnUserCommentsText(cl,media_ids):
-    print("Getting user comments...")
-    comments_data = []
-    for media_id in media_ids:
-        comments = []
-        for(comment) in cl.media_comments(media_id):
-            comments.append(comment.text)
-            
-        comments_data.append({
-            "media_ID": media_id,
-            "comments": comments
-        })
-    return comments_data
-
-def exportToCSV(comments_data):
-    print("Exporting to CSV...")
-    csv_data = []
-    print(comments_data)
-    for item in comments_data:
-        media_id = item['media_ID'] 
-        comments = item['comments']
-        for comment in comments:
-            csv_data.append({'media_id': media_id, 'comment': comment})
-    csv_file_path = "comments_export.csv"
-    with open(csv_file_path, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=['media_id', 'comment'])
-        writer.writeheader()
-        writer.writerows(csv_data)
-        
-    
-if __name__ == "__main__":
-   
-    #exportToCSV(comments_data)
-    print("Comments exported to comments_export.csv")
+from instagrapi import Client
+from instagrapi.exceptions import ClientLoginRequired, ClientUnauthorizedError, LoginRequired
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+SESSIONS_DIR = "sessions"
+SESSION_MAX_AGE = 6 * 60 * 60
+# Errors meaning the session itself is no longer valid; anything else is not a login problem
+AUTH_ERRORS = (LoginRequired, ClientLoginRequired, ClientUnauthorizedError)
+
+# username -> user id, shared by every request; the least recently used are dropped
+USER_ID_CACHE_SIZE = 10000
+_user_ids = OrderedDict()
+_user_ids_lock = threading.Lock()
+
+def insta_login(username, password):
+    print("Logging you in...")
+    cl = Client()
+    cl.login(username, password)
+    return cl
+
+def getUserId(cl,username):
+    """
+    Resolves a username to its user id, looking it up only the first time.
+    """
+    with _user_ids_lock:
+        if username in _user_ids:
+            _user_ids.move_to_end(username)
+            return _user_ids[username]
+    print("Getting user id...")
+    user_id = cl.user_id_from_username(username)
+    with _user_ids_lock:
+        _user_ids[username] = user_id
+        while len(_user_ids) > USER_ID_CACHE_SIZE:
+            _user_ids.popitem(last=False)
+    return user_id
+
+# Authenticated clients reused across requests
+class ClientPool:
+    """
+    Keeps one logged-in client per account and persists its session settings to
+    SESSIONS_DIR, so restarts resume the session instead of doing a full login.
+    A client or stored session is reused only when the same password is presented
+    (checked against a salted hash kept next to the session file); sessions older
+    than max_age, or ones reported broken via invalidate(), are logged in again.
+    client_factory builds new clients (instagrapi.Client by default, a fake in tests).
+    """
+
+    def __init__(self, client_factory=Client, directory=SESSIONS_DIR, max_age=SESSION_MAX_AGE):
+        self.client_factory = client_factory
+        self.directory = directory
+        self.max_age = max_age
+        self._clients = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _account_lock(self, username):
+        with self._lock:
+            return self._locks.setdefault(username, threading.Lock())
+
+    def _settings_path(self, username):
+        return os.path.join(self.directory, hashlib.sha256(username.encode("utf-8")).hexdigest() + ".json")
+
+    @staticmethod
+    def _password_digest(password, salt):
+        return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, 100000).hex()
+
+    def _stored_session_matches(self, path, password):
+        try:
+            with open(path + ".key", encoding="utf-8") as file:
+                key = json.load(file)
+            digest = self._password_digest(password, bytes.fromhex(key["salt"]))
+            return hmac.compare_digest(digest, key["digest"]) and time.time() - key["created"] < self.max_age
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def get(self, username, password):
+        """
+        Returns an authenticated client for the account, logging in only when needed.
+        """
+        with self._account_lock(username):
+            entry = self._clients.get(username)
+            if entry is not None:
+                cl, salt, digest, logged_in_at = entry
+                if (hmac.compare_digest(self._password_digest(password, salt), digest)
+                        and time.time() - logged_in_at < self.max_age):
+                    return cl
+
+            cl = self.client_factory()
+            path = self._settings_path(username)
+            resumed = False
+            if os.path.exists(path) and self._stored_session_matches(path, password):
+                try:
+                    cl.load_settings(path)
+                    resumed = True
+                except Exception as e:
+                    print(f"Ignoring unreadable session for {username}: {e}")
+                    cl = self.client_factory()
+            print("Logging you in...")
+            cl.login(username, password)
+            cl.dump_settings(path)
+
+            salt = os.urandom(16)
+            digest = self._password_digest(password, salt)
+            if not resumed:
+                with open(path + ".key", "w", encoding="utf-8") as file:
+                    json.dump({"salt": salt.hex(), "digest": digest, "created": time.time()}, file)
+            self._clients[username] = (cl, salt, digest, time.time())
+            return cl
+
+    def invalidate(self, username):
+        """
+        Drops the cached client and stored session, forcing a fresh login next time.
+        """
+        with self._account_lock(username):
+            self._clients.pop(username, None)
+            for path in (self._settings_path(username), self._settings_path(username) + ".key"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def run(self, username, password, func):
+        """
+        Calls func(client); if the session turns out to be expired (AUTH_ERRORS), logs
+        in again once and retries. Other errors are raised unchanged.
+        """
+        cl = self.get(username, password)
+        try:
+            return func(cl)
+        except AUTH_ERRORS as e:
+            print(f"Session for {username} failed ({e}), logging in again...")
+            self.invalidate(username)
+            return func(self.get(username, password))
+
+def returnUserMediaObjects(user_id,n,cl):
+    print("Getting user media...")
+    return cl.user_medias(user_id, n)
+
+def returnUserMedia(user_id,n,cl):
+    medias = returnUserMediaObjects(user_id, n, cl)
+    media_ids = [media.id for media in medias]
+    return media_ids
+
+# Token-bucket rate limiter shared by the fetch threads
+class TokenBucket:
+    """
+    Allows `rate` calls per second on average, with bursts of up to `capacity`.
+    acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def fetchMediaComments(cl, media_id, limiter=None, retries=3, backoff=1.0, amount=0):
+    """
+    Fetches the comment objects of one media, retrying failed calls with exponential backoff.
+    AUTH_ERRORS are raised right away: retrying cannot fix an expired session, and
+    ClientPool.run logs in again when it sees one.
+    amount > 0 asks for only that many of the newest comments, 0 for all of them. It is
+    always passed on: instagrapi's own default is only the newest 20.
+    """
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return cl.media_comments(media_id, amount)
+        except AUTH_ERRORS:
+            raise
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * (2 ** attempt)
+            print(f"Fetching comments for {media_id} failed ({e}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+def returnUserCommentsText(cl,media_ids, concurrency=1, rate_limit=None, retries=3, backoff=1.0):
+    """
+    Returns [{"media_ID": ..., "comments": [...]}] in media_ids order.
+    concurrency > 1 fetches several media at once in a bounded thread pool;
+    rate_limit caps the request rate (calls per second) across all threads.
+    """
+    print("Getting user comments...")
+    limiter = TokenBucket(rate_limit) if rate_limit else None
+
+    def fetch(media_id):
+        comments = fetchMediaComments(cl, media_id, limiter, retries, backoff)
+        return {
+            "media_ID": media_id,
+            "comments": [comment.text for comment in comments]
+        }
+
+    if concurrency <= 1:
+        return [fetch(media_id) for media_id in media_ids]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(fetch, media_ids))
+
+def commentsToFrame(comments_data):
+    """
+    Flattens comments_data into a (media_id, comment) DataFrame, the layout of comments_export.csv.
+    """
+    rows = [(item['media_ID'], comment) for item in comments_data for comment in item['comments']]
+    return pd.DataFrame(rows, columns=['media_id', 'comment'])
+
+def exportToCSV(comments_data):
+    print("Exporting to CSV...")
+    csv_data = []
+    print(comments_data)
+    for item in comments_data:
+        media_id = item['media_ID'] 
+        comments = item['comments']
+        for comment in comments:
+            csv_data.append({'media_id': media_id, 'comment': comment})
+    csv_file_path = "comments_export.csv"
+    with open(csv_file_path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=['media_id', 'comment'])
+        writer.writeheader()
+        writer.writerows(csv_data)
+        
+    
+if __name__ == "__main__":
+   
+    #exportToCSV(comments_data)
+    print("Comments exported to comments_export.csv")
@@ -0,0 +1,189 @@
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+from types import SimpleNamespace
+
+from PIL import Image
+
+
+# Local stand-in for the generative model backend in prompt.py
+class FakeModelBackend:
+    """
+    Returns canned text after `latency` seconds, failing with probability failure_rate.
+    """
+
+    def __init__(self, latency=0.5, text="Day 1: post a sunset photo.", failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.text = text
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, images):
+        with self._lock:
+            self.calls += 1
+            failed = self.failure_rate and self._random.random() < self.failure_rate
+        time.sleep(self.latency)
+        if failed:
+            raise ConnectionError("Simulated model failure")
+        return self.text
+
+# Local stand-in for the requests session in thumbnails.py
+class FakeHttpSession:
+    """
+    Answers get() with a JPEG after `latency` seconds, failing with probability
+    failure_rate. Each URL gets its own solid colour, so different posts have
+    different image bytes (and prediction cache keys).
+    """
+
+    def __init__(self, latency=0.1, size=640, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.size = size
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout=None):
+        with self._lock:
+            self.calls += 1
+            failed = self.failure_rate and self._random.random() < self.failure_rate
+        time.sleep(self.latency)
+        if failed:
+            raise ConnectionError("Simulated download failure")
+        checksum = zlib.crc32(str(url).encode("utf-8"))
+        colour = (checksum & 0xFF, (checksum >> 8) & 0xFF, (checksum >> 16) & 0xFF)
+        buffer = BytesIO()
+        Image.new("RGB", (self.size, self.size), colour).save(buffer, "JPEG")
+        return SimpleNamespace(content=buffer.getvalue(), status_code=200, raise_for_status=lambda: None)
+
+# Raised by FakeClient when it is called faster than its throttle allows
+class FakeThrottleError(Exception):
+    pass
+
+# Local stand-in for instagrapi.Client
+class FakeClient:
+    """
+    Mimics the parts of instagrapi.Client the app uses, without any network access.
+    Every API call sleeps for `latency` seconds; more than `max_calls_per_second`
+    calls in a one-second window raise FakeThrottleError, like Instagram's rate limits.
+    Comments are generated deterministically from the seed and returned newest first.
+    With comments_per_second > 0 every media also receives new comments over
+    wall-clock time, for exercising the live-watch mode.
+    """
+
+    sample_comments = [
+        "🔥🔥🔥", "❤️", "first", "love this!! #blessed", "not good at all",
+        "so beautiful 😍", "follow me for free followers", "meh", "worst post ever 😡",
+        "amazing shot, where is this?", "never disappoint", "🙌🙌", "this is so cool",
+    ]
+
+    def __init__(self, latency=0.05, comments_per_media=50, media_count=15,
+                 max_calls_per_second=None, failure_rate=0.0, seed=0,
+                 thumbnail_base_url="http://127.0.0.1:8765/thumbnails", comments_per_second=0.0):
+        self.latency = latency
+        self.comments_per_media = comments_per_media
+        self.media_count = media_count
+        self.max_calls_per_second = max_calls_per_second
+        self.failure_rate = failure_rate
+        self.thumbnail_base_url = thumbnail_base_url
+        self.calls = 0
+        self.throttled = 0
+        self.logins = 0
+        self.settings = {}
+        self.extra_comments = {}
+        self.comments_per_second = comments_per_second
+        self.live_started = time.time()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = []
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+            now = time.monotonic()
+            self._window = [t for t in self._window if now - t < 1.0]
+            self._window.append(now)
+            if self.max_calls_per_second and len(self._window) > self.max_calls_per_second:
+                self.throttled += 1
+                raise FakeThrottleError("Please wait a few minutes before you try again.")
+            if self.failure_rate and self._random.random() < self.failure_rate:
+                raise ConnectionError("Simulated network failure")
+        time.sleep(self.latency)
+
+    def login(self, username, password):
+        # instagrapi resumes a loaded session instead of authenticating again
+        if self.settings.get("username") == username:
+            return True
+        self._call()
+        self.logins += 1
+        self.settings = {"username": username, "session": f"session_{username}"}
+        return True
+
+    def dump_settings(self, path):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.settings, file)
+
+    def load_settings(self, path):
+        with open(path, encoding="utf-8") as file:
+            self.settings = json.load(file)
+
+    def user_id_from_username(self, username):
+        self._call()
+        return f"uid_{username}"
+
+    def user_medias(self, user_id, amount=0):
+        self._call()
+        count = amount or self.media_count
+        return [
+            SimpleNamespace(id=media_id, comment_count=self._comment_count(media_id))
+            for media_id in (f"{user_id}_media_{i}" for i in range(min(count, self.media_count)))
+        ]
+
+    def media_info(self, media_id):
+        self._call()
+        return SimpleNamespace(
+            id=media_id,
+            comment_count=self._comment_count(media_id),
+            thumbnail_url=f"{self.thumbnail_base_url}/{media_id}.jpg",
+        )
+
+    def post_comments(self, media_id, n=1):
+        """
+        Simulates n new comments arriving on a media.
+        """
+        with self._lock:
+            self.extra_comments[media_id] = self.extra_comments.get(media_id, 0) + n
+
+    def _live_count(self):
+        return int((time.time() - self.live_started) * self.comments_per_second)
+
+    def _comment_count(self, media_id):
+        return self.comments_per_media + self.extra_comments.get(media_id, 0) + self._live_count()
+
+    def media_comments(self, media_id, amount=20):
+        # Same default as instagrapi: the newest 20 comments unless amount is given, 0 for all
+        self._call()
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        rng = random.Random(f"{media_id}")
+        comments = []
+        for i in range(self.comments_per_media + self.extra_comments.get(media_id, 0)):
+            comments.append(SimpleNamespace(
+                pk=f"{media_id}_c{i}",
+                text=rng.choice(self.sample_comments),
+                created_at_utc=start + timedelta(minutes=i),
+            ))
+        live_start = datetime.fromtimestamp(self.live_started, timezone.utc)
+        for i in range(self._live_count()):
+            comments.append(SimpleNamespace(
+                pk=f"{media_id}_l{i}",
+                text=rng.choice(self.sample_comments),
+                created_at_utc=live_start + timedelta(seconds=i / self.comments_per_second),
+            ))
+        comments.reverse()
+        return comments[:amount] if amount else comments
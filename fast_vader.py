@@ -0,0 +1,232 @@
+import string
+import sys
+
+import numpy as np
+from vaderSentiment.vaderSentiment import (
+    BOOSTER_DICT, C_INCR, N_SCALAR, NEGATE, SPECIAL_CASES,
+    SentimentIntensityAnalyzer, normalize,
+)
+
+_negate = frozenset(NEGATE)
+_so_this = ("so", "this")
+
+
+# Batch VADER compound scorer
+class BatchVader:
+    """
+    Computes the same compound score as SentimentIntensityAnalyzer.polarity_scores,
+    but works from a precompiled lexicon index and a single lowercased token list per
+    text instead of re-lowercasing the whole sentence for every lexicon word. Only the
+    compound score is produced; the rare 'but' rule is delegated to vaderSentiment so
+    its quirks are kept exactly.
+    """
+
+    def __init__(self, analyzer=None):
+        self.analyzer = analyzer or SentimentIntensityAnalyzer()
+        self.lexicon = self.analyzer.lexicon
+        self.emojis = self.analyzer.emojis
+        self.emoji_chars = frozenset(self.emojis)
+
+    def _replace_emojis(self, text):
+        # Same walk as polarity_scores: swap emojis for their descriptions
+        text_no_emoji = ""
+        prev_space = True
+        for chr in text:
+            if chr in self.emojis:
+                if not prev_space:
+                    text_no_emoji += ' '
+                text_no_emoji += self.emojis[chr]
+                prev_space = False
+            else:
+                text_no_emoji += chr
+                prev_space = chr == ' '
+        return text_no_emoji
+
+    @staticmethod
+    def _words(text):
+        words = []
+        for token in text.split():
+            stripped = token.strip(string.punctuation)
+            words.append(token if len(stripped) <= 2 else stripped)
+        return words
+
+    def compound(self, text):
+        """
+        Returns the compound score of one text.
+        """
+        if not isinstance(text, str):
+            return self.analyzer.polarity_scores(text)['compound']
+        if not self.emoji_chars.isdisjoint(text):
+            text = self._replace_emojis(text)
+        text = text.strip()
+
+        words = self._words(text)
+        n = len(words)
+        if n == 0:
+            return 0.0
+        lower = [word.lower() for word in words]
+        allcaps = sum(1 for word in words if word.isupper())
+        is_cap_diff = 0 < n - allcaps < n
+        lexicon = self.lexicon
+
+        sentiments = []
+        for i, word in enumerate(words):
+            item = lower[i]
+            if item in BOOSTER_DICT or item not in lexicon:
+                sentiments.append(0)
+                continue
+            if item == "kind" and i < n - 1 and lower[i + 1] == "of":
+                sentiments.append(0)
+                continue
+            sentiments.append(self._valence(words, lower, i, is_cap_diff))
+
+        if "but" in lower:
+            sentiments = SentimentIntensityAnalyzer._but_check(words, sentiments)
+
+        sum_s = float(sum(sentiments))
+        amplifier = self._punctuation_emphasis(text)
+        if sum_s > 0:
+            sum_s += amplifier
+        elif sum_s < 0:
+            sum_s -= amplifier
+        return round(normalize(sum_s), 4)
+
+    def _valence(self, words, lower, i, is_cap_diff):
+        lexicon = self.lexicon
+        n = len(words)
+        item = lower[i]
+        valence = lexicon[item]
+        if item == "no" and i != n - 1 and lower[i + 1] in lexicon:
+            valence = 0.0
+        if (i > 0 and lower[i - 1] == "no") \
+                or (i > 1 and lower[i - 2] == "no") \
+                or (i > 2 and lower[i - 3] == "no" and lower[i - 1] in ("or", "nor")):
+            valence = lexicon[item] * N_SCALAR
+
+        if is_cap_diff and words[i].isupper():
+            if valence > 0:
+                valence += C_INCR
+            else:
+                valence -= C_INCR
+
+        for start_i in range(0, 3):
+            j = i - (start_i + 1)
+            if i > start_i and lower[j] not in lexicon:
+                s = 0.0
+                if lower[j] in BOOSTER_DICT:
+                    s = BOOSTER_DICT[lower[j]]
+                    if valence < 0:
+                        s *= -1
+                    if words[j].isupper() and is_cap_diff:
+                        if valence > 0:
+                            s += C_INCR
+                        else:
+                            s -= C_INCR
+                if start_i == 1 and s != 0:
+                    s = s * 0.95
+                if start_i == 2 and s != 0:
+                    s = s * 0.9
+                valence = valence + s
+                valence = self._negation_check(valence, lower, start_i, i)
+                if start_i == 2:
+                    valence = self._special_idioms_check(valence, lower, i)
+
+        # "least" as a negation
+        if i > 1 and lower[i - 1] not in lexicon and lower[i - 1] == "least":
+            if lower[i - 2] != "at" and lower[i - 2] != "very":
+                valence = valence * N_SCALAR
+        elif i > 0 and lower[i - 1] not in lexicon and lower[i - 1] == "least":
+            valence = valence * N_SCALAR
+        return valence
+
+    @staticmethod
+    def _negated(word):
+        return word in _negate or "n't" in word
+
+    def _negation_check(self, valence, lower, start_i, i):
+        if start_i == 0:
+            if self._negated(lower[i - 1]):
+                valence = valence * N_SCALAR
+        if start_i == 1:
+            if lower[i - 2] == "never" and lower[i - 1] in _so_this:
+                valence = valence * 1.25
+            elif lower[i - 2] == "without" and lower[i - 1] == "doubt":
+                pass
+            elif self._negated(lower[i - 2]):
+                valence = valence * N_SCALAR
+        if start_i == 2:
+            if (lower[i - 3] == "never" and lower[i - 2] in _so_this) or lower[i - 1] in _so_this:
+                valence = valence * 1.25
+            elif lower[i - 3] == "without" and (lower[i - 2] == "doubt" or lower[i - 1] == "doubt"):
+                pass
+            elif self._negated(lower[i - 3]):
+                valence = valence * N_SCALAR
+        return valence
+
+    @staticmethod
+    def _special_idioms_check(valence, lower, i):
+        onezero = f"{lower[i - 1]} {lower[i]}"
+        twoonezero = f"{lower[i - 2]} {lower[i - 1]} {lower[i]}"
+        twoone = f"{lower[i - 2]} {lower[i - 1]}"
+        threetwoone = f"{lower[i - 3]} {lower[i - 2]} {lower[i - 1]}"
+        threetwo = f"{lower[i - 3]} {lower[i - 2]}"
+
+        for seq in (onezero, twoonezero, twoone, threetwoone, threetwo):
+            if seq in SPECIAL_CASES:
+                valence = SPECIAL_CASES[seq]
+                break
+
+        if len(lower) - 1 > i:
+            zeroone = f"{lower[i]} {lower[i + 1]}"
+            if zeroone in SPECIAL_CASES:
+                valence = SPECIAL_CASES[zeroone]
+        if len(lower) - 1 > i + 1:
+            zeroonetwo = f"{lower[i]} {lower[i + 1]} {lower[i + 2]}"
+            if zeroonetwo in SPECIAL_CASES:
+                valence = SPECIAL_CASES[zeroonetwo]
+
+        for n_gram in (threetwoone, threetwo, twoone):
+            if n_gram in BOOSTER_DICT:
+                valence = valence + BOOSTER_DICT[n_gram]
+        return valence
+
+    @staticmethod
+    def _punctuation_emphasis(text):
+        ep_count = min(text.count("!"), 4)
+        qm_count = text.count("?")
+        qm_amplifier = 0
+        if qm_count > 1:
+            qm_amplifier = qm_count * 0.18 if qm_count <= 3 else 0.96
+        return ep_count * 0.292 + qm_amplifier
+
+    def compound_batch(self, texts):
+        """
+        Returns a float64 array of compound scores, one per text.
+        """
+        return np.fromiter((self.compound(text) for text in texts), dtype=np.float64, count=len(texts))
+
+# Function to check the fast path against vaderSentiment
+def max_difference(texts, scorer=None):
+    """
+    Returns the largest absolute difference between BatchVader and polarity_scores on texts.
+    """
+    scorer = scorer or BatchVader()
+    texts = list(texts)
+    fast = scorer.compound_batch(texts)
+    reference = np.array([scorer.analyzer.polarity_scores(text)['compound'] for text in texts])
+    return float(np.max(np.abs(fast - reference))) if texts else 0.0
+
+if __name__ == "__main__":
+    # Equivalence check: python fast_vader.py [dataset.csv ...]
+    import pandas as pd
+    from senti_analysis import preprocess_batch
+
+    scorer = BatchVader()
+    worst = 0.0
+    for path in sys.argv[1:] or ["test.csv", "idktest.csv"]:
+        texts = pd.read_csv(path, sep='\t', encoding='utf-8', encoding_errors='replace')['text'].fillna('').astype(str).tolist()
+        for name, batch in (("raw", texts), ("preprocessed", preprocess_batch(texts))):
+            difference = max_difference(batch, scorer)
+            worst = max(worst, difference)
+            print(f"{path} ({name}): max |fast - polarity_scores| = {difference:.3g} over {len(batch)} texts")
+    sys.exit(0 if worst <= 1e-9 else 1)
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from aggregation import comment_weights
+
+SENTIMENT_CLASSES = ['negative', 'neutral', 'positive']
+
+# What compact_frame does with the comment / Cleaned_Comment columns
+TEXT_MODES = ("keep", "intern", "drop")
+TEXT_COLUMNS = ['comment', 'Cleaned_Comment']
+
+
+# Measure the memory held by a frame
+def memory_report(data):
+    """
+    Returns {column: bytes} for data, counting the strings held by object columns,
+    plus 'index' and 'total'.
+    """
+    usage = data.memory_usage(deep=True)
+    report = {str(column): int(size) for column, size in usage.items()}
+    report['total'] = int(usage.sum())
+    return report
+
+# Shrink a processed comment frame
+def compact_frame(data, text="keep"):
+    """
+    Returns a copy of a processed frame (process_dataset layout) that takes far less memory:
+    - media_id and Sentiment_Class become categoricals
+    - Sentiment_Score becomes float32 (scores are rounded to 4 decimals anyway)
+    - Weight (word count of Cleaned_Comment) is stored as the smallest unsigned integer
+    text picks what happens to the comment and Cleaned_Comment columns: "keep" leaves
+    them as they are, "intern" stores each distinct string once (categorical), "drop"
+    removes them, which is safe because aggregate_scores then uses Weight.
+    The before/after memory_report is stored in data.attrs['memory'].
+    """
+    if text not in TEXT_MODES:
+        raise ValueError(f"text must be one of {TEXT_MODES}, got {text!r}")
+    before = memory_report(data)
+    data = data.copy()
+
+    if 'Cleaned_Comment' in data.columns and 'Weight' not in data.columns:
+        data['Weight'] = comment_weights(data['Cleaned_Comment'])
+    for column in ('Weight', 'Cluster_Id', 'Cluster_Size'):
+        if column in data.columns:
+            data[column] = pd.to_numeric(data[column], downcast='unsigned')
+    data['media_id'] = data['media_id'].astype('category')
+    if 'Sentiment_Class' in data.columns:
+        data['Sentiment_Class'] = pd.Categorical(data['Sentiment_Class'], categories=SENTIMENT_CLASSES)
+    if 'Sentiment_Score' in data.columns:
+        data['Sentiment_Score'] = data['Sentiment_Score'].astype(np.float32)
+
+    columns = [column for column in TEXT_COLUMNS if column in data.columns]
+    if text == "intern":
+        for column in columns:
+            data[column] = data[column].astype('category')
+    elif text == "drop":
+        data = data.drop(columns=columns)
+
+    data.attrs['memory'] = {'before': before, 'after': memory_report(data)}
+    print(f"Compacted frame: {before['total'] / 1e6:.2f}MB -> {data.attrs['memory']['after']['total'] / 1e6:.2f}MB")
+    return data
@@ -0,0 +1,130 @@
+import os
+import shutil
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from metrics import span, start_trace, stop_trace
+
+JOBS_DIR = "jobs"
+
+
+# One queued /analyze run
+class Job:
+    """
+    Tracks the status, current stage and per-stage timings of one analysis run.
+    Each job writes its files into its own workspace directory.
+    """
+
+    def __init__(self, job_id, workspace):
+        self.id = job_id
+        self.workspace = workspace
+        self.status = "queued"
+        self.stage_name = None
+        self.stages = []
+        self.result = None
+        self.error = None
+        self.trace = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.done = threading.Event()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Marks name as the running stage and records it as a metrics span.
+        Yields the span, so the caller can set its item count.
+        """
+        self.stage_name = name
+        current = span(name)
+        try:
+            with current:
+                yield current
+        finally:
+            self.stages.append({"name": name, "seconds": round(current.seconds, 4), "items": current.items})
+
+    def path(self, name):
+        return os.path.join(self.workspace, name)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage_name,
+            "stages": list(self.stages),
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+# Worker pool running analysis jobs in the background
+class JobQueue:
+    """
+    Runs submitted functions on a bounded thread pool. Each job gets an isolated
+    workspace under JOBS_DIR. Past max_jobs, the oldest finished jobs are forgotten
+    and their workspaces deleted; queued and running jobs are never evicted.
+    With trace=True every span a job records is kept in job.trace.
+    """
+
+    def __init__(self, workers=4, directory=JOBS_DIR, max_jobs=200, trace=False):
+        self.directory = directory
+        self.max_jobs = max_jobs
+        self.trace = trace
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queues func(job, *args, **kwargs) and returns the Job immediately.
+        Whatever func returns becomes job.result.
+        """
+        job_id = uuid.uuid4().hex
+        workspace = os.path.join(self.directory, job_id)
+        os.makedirs(workspace, exist_ok=True)
+        job = Job(job_id, workspace)
+        with self._lock:
+            self._jobs[job_id] = job
+            evicted = self._evict()
+        for old in evicted:
+            shutil.rmtree(old.workspace, ignore_errors=True)
+        self._pool.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _evict(self):
+        # Called with the lock held; returns the finished jobs dropped, oldest first
+        excess = len(self._jobs) - self.max_jobs
+        evicted = []
+        for job_id, job in self._jobs.items():
+            if len(evicted) >= excess:
+                break
+            if job.done.is_set():
+                evicted.append(job)
+        for job in evicted:
+            del self._jobs[job.id]
+        return evicted
+
+    def _run(self, job, func, args, kwargs):
+        job.status = "running"
+        if self.trace:
+            job.trace = start_trace()["spans"]
+        try:
+            job.result = func(job, *args, **kwargs)
+            job.status = "done"
+        except Exception as e:
+            traceback.print_exc()
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = "failed"
+        finally:
+            if self.trace:
+                stop_trace()
+            job.finished_at = time.time()
+            job.done.set()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
@@ -0,0 +1,309 @@
+import heapq
+import itertools
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from aggregation import comment_weights
+from extract import TokenBucket, fetchMediaComments
+from metrics import span
+from senti_analysis import score_comments
+
+LIVE_POLL_SECONDS = 10
+LIVE_WINDOW_SECONDS = 3600
+LIVE_FETCH_CONCURRENCY = 4
+LIVE_FETCH_RATE = 5
+# Comments read on the first poll of a post; later polls only read what is new
+LIVE_BACKFILL = 200
+# Extra comments read per poll in case some arrived between the count check and the fetch
+LIVE_FETCH_MARGIN = 5
+# Seconds between keep-alive lines on an idle event stream
+LIVE_HEARTBEAT_SECONDS = 15
+# Updates buffered per subscriber; a client that falls further behind misses some
+LIVE_QUEUE_SIZE = 100
+
+
+# Time-windowed, length-weighted sentiment per post
+class RollingAggregate:
+    """
+    Keeps the comments of the last `window` seconds per media_id with running sums,
+    so adding comments and expiring old ones never rescans a post. Scores are
+    weighted by the word count of the cleaned comment, like aggregate_scores;
+    posts whose comments carry no weight score 0.
+    """
+
+    def __init__(self, window=LIVE_WINDOW_SECONDS):
+        self.window = window
+        self._events = {}  # media_id -> heap of (timestamp, seq, weighted score, weight)
+        self._sums = {}  # media_id -> [weighted score, weight, comments]
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def add(self, media_id, timestamps, scores, weights, now=None):
+        """
+        Adds scored comments; ones already older than the window are ignored.
+        """
+        cutoff = (time.time() if now is None else now) - self.window
+        with self._lock:
+            events = self._events.setdefault(media_id, [])
+            sums = self._sums.setdefault(media_id, [0.0, 0, 0])
+            for timestamp, score, weight in zip(timestamps, scores, weights):
+                if timestamp < cutoff:
+                    continue
+                weighted = float(score) * int(weight)
+                heapq.heappush(events, (timestamp, next(self._order), weighted, int(weight)))
+                sums[0] += weighted
+                sums[1] += int(weight)
+                sums[2] += 1
+
+    def expire(self, now=None):
+        """
+        Drops comments that left the window and returns the media_ids that changed.
+        """
+        cutoff = (time.time() if now is None else now) - self.window
+        changed = set()
+        with self._lock:
+            for media_id, events in self._events.items():
+                sums = self._sums[media_id]
+                while events and events[0][0] < cutoff:
+                    _, _, weighted, weight = heapq.heappop(events)
+                    sums[0] -= weighted
+                    sums[1] -= weight
+                    sums[2] -= 1
+                    changed.add(media_id)
+                if not events:
+                    sums[:] = [0.0, 0, 0]  # clears float drift once the window is empty
+        return changed
+
+    def remove(self, media_id):
+        with self._lock:
+            self._events.pop(media_id, None)
+            self._sums.pop(media_id, None)
+
+    def snapshot(self, media_id):
+        with self._lock:
+            weighted, weight, count = self._sums.get(media_id, (0.0, 0, 0))
+        return {
+            'media_id': media_id,
+            'Aggregate_Score': weighted / weight if weight > 0 else 0.0,
+            'Comment_Count': count,
+            'Weight': weight,
+            'window': self.window,
+        }
+
+class _Watch:
+    def __init__(self):
+        self.clients = {}  # owner -> client; any of them can poll the post
+        self.seen = {}  # pk -> timestamp of the comments still inside the window
+        self.comment_count = None
+        self.polled = False
+        self.next_poll = 0.0
+        self.polling = False
+
+# Live comment polling for many posts
+class LiveWatcher:
+    """
+    Polls watched posts for new comments and keeps a RollingAggregate per post.
+
+    One scheduler thread serves every watched post: each post is polled at most once
+    per `interval`, first with a cheap media_info call, and its comments are only
+    fetched when the comment count moved. Only comments not seen before are scored.
+    Fetches run on a small pool with a shared rate limit, so CPU and API use stay
+    flat however many posts are watched. Updates go to subscriber queues (see
+    subscribe), which the server-sent-events endpoint drains.
+
+    Each watch records the owners (accounts) that asked for it; a post stays watched
+    until its last owner unwatches it.
+    """
+
+    def __init__(self, interval=LIVE_POLL_SECONDS, window=LIVE_WINDOW_SECONDS, cache=None,
+                 concurrency=LIVE_FETCH_CONCURRENCY, rate_limit=LIVE_FETCH_RATE):
+        self.interval = interval
+        self.cache = cache
+        self.aggregate = RollingAggregate(window)
+        self._limiter = TokenBucket(rate_limit) if rate_limit else None
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="live")
+        self._watches = {}
+        self._subscribers = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def watch(self, cl, media_id, owner=None):
+        """
+        Starts watching media_id for owner with client cl; the first poll happens right away.
+        """
+        with self._cond:
+            watch = self._watches.setdefault(media_id, _Watch())
+            watch.clients[owner] = cl
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="live-scheduler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def unwatch(self, media_id, owner=None):
+        """
+        Stops watching media_id for owner; the post is dropped once no owner is left.
+        """
+        with self._cond:
+            watch = self._watches.get(media_id)
+            if watch is None:
+                return
+            watch.clients.pop(owner, None)
+            if watch.clients:
+                return
+            del self._watches[media_id]
+        self.aggregate.remove(media_id)
+
+    def watched(self, owner=None):
+        """
+        Returns the media_ids watched for owner.
+        """
+        with self._cond:
+            return [media_id for media_id, watch in self._watches.items() if owner in watch.clients]
+
+    def subscribe(self, media_ids=None):
+        """
+        Returns a queue receiving a snapshot dict whenever one of media_ids (all
+        watched posts if None) changes. It starts with the current snapshots.
+        """
+        updates = queue.Queue(maxsize=LIVE_QUEUE_SIZE)
+        with self._cond:
+            self._subscribers[updates] = set(media_ids) if media_ids else None
+            current = list(media_ids) if media_ids else list(self._watches)
+        for media_id in current:
+            self._offer(updates, self.aggregate.snapshot(media_id))
+        return updates
+
+    def unsubscribe(self, updates):
+        with self._cond:
+            self._subscribers.pop(updates, None)
+
+    @staticmethod
+    def _offer(updates, snapshot):
+        try:
+            updates.put_nowait(snapshot)
+        except queue.Full:
+            pass
+
+    def _publish(self, media_ids):
+        if not media_ids:
+            return
+        snapshots = {media_id: self.aggregate.snapshot(media_id) for media_id in media_ids}
+        with self._cond:
+            subscribers = list(self._subscribers.items())
+        for updates, wanted in subscribers:
+            for media_id, snapshot in snapshots.items():
+                if wanted is None or media_id in wanted:
+                    self._offer(updates, snapshot)
+
+    def poll(self, media_id):
+        """
+        Fetches and scores the new comments of one watched post; returns how many there were.
+        """
+        with self._cond:
+            watch = self._watches.get(media_id)
+            cl = next(iter(watch.clients.values()), None) if watch is not None else None
+        if cl is None:
+            return 0
+        with span("live_poll") as current:
+            if self._limiter is not None:
+                self._limiter.acquire()
+            count = getattr(cl.media_info(media_id), 'comment_count', None)
+            if watch.polled and count is not None and count == watch.comment_count:
+                current.items = 0
+                return 0
+            if not watch.polled:
+                amount = LIVE_BACKFILL
+            elif count is None or watch.comment_count is None:
+                amount = 0  # no count to go by: read every comment (0 is passed on as "all")
+            else:
+                amount = max(count - watch.comment_count, 0) + LIVE_FETCH_MARGIN
+            comments = fetchMediaComments(cl, media_id, self._limiter, amount=amount)
+            now = time.time()
+            cutoff = now - self.aggregate.window
+            # Comments that left the window are forgotten, so seen stays as small as
+            # the window; one read again later is older than the cutoff and skipped
+            watch.seen = {pk: timestamp for pk, timestamp in watch.seen.items() if timestamp >= cutoff}
+            new = []
+            for comment in comments:
+                pk = str(comment.pk)
+                timestamp = comment.created_at_utc.timestamp() if comment.created_at_utc else now
+                if pk not in watch.seen and timestamp >= cutoff:
+                    watch.seen[pk] = timestamp
+                    new.append((comment.text, timestamp))
+            watch.comment_count = count
+            watch.polled = True
+            current.items = len(new)
+            if not new:
+                return 0
+            texts, timestamps = zip(*new)
+            cleaned, scores, _ = score_comments(list(texts), self.cache)
+            weights = comment_weights(pd.Series(cleaned, dtype=object))
+            # Added under the lock, so an unwatch during the fetch cannot leave behind
+            # aggregate entries that nothing removes any more
+            with self._cond:
+                if self._watches.get(media_id) is not watch:
+                    return 0
+                self.aggregate.add(media_id, timestamps, scores, weights, now)
+        self._publish([media_id])
+        return len(new)
+
+    def _poll_safely(self, media_id):
+        try:
+            self.poll(media_id)
+        except Exception as e:
+            print(f"Error polling comments for {media_id}: {e}")
+        finally:
+            with self._cond:
+                watch = self._watches.get(media_id)
+                if watch is not None:
+                    watch.polling = False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                due = [media_id for media_id, watch in self._watches.items()
+                       if watch.next_poll <= now and not watch.polling]
+                for media_id in due:
+                    watch = self._watches[media_id]
+                    watch.polling = True
+                    watch.next_poll = now + self.interval
+                if not due:
+                    upcoming = [watch.next_poll for watch in self._watches.values() if not watch.polling]
+                    wait = min(upcoming, default=now + self.interval) - now
+                    self._cond.wait(timeout=max(0.05, min(wait, self.interval)))
+            for media_id in due:
+                self._pool.submit(self._poll_safely, media_id)
+            self._publish(self.aggregate.expire())
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._pool.shutdown(wait=False)
+
+# Function to stream updates as server-sent events
+def event_stream(watcher, media_ids=None, heartbeat=LIVE_HEARTBEAT_SECONDS):
+    """
+    Generator of text/event-stream chunks: one 'update' event per snapshot, and a
+    comment line after `heartbeat` idle seconds so proxies keep the connection open.
+    """
+    updates = watcher.subscribe(media_ids)
+    try:
+        while True:
+            try:
+                snapshot = updates.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: update\ndata: {json.dumps(snapshot)}\n\n"
+    finally:
+        watcher.unsubscribe(updates)
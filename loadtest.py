@@ -0,0 +1,265 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+from fakes import FakeClient, FakeHttpSession, FakeModelBackend
+
+# Each scenario: concurrent users, analyses per user, distinct accounts (None: one
+# per user), and the latency/volume/failure settings of the stand-ins
+SCENARIOS = {
+    "baseline": {"users": 8, "requests_per_user": 2, "accounts": None,
+                 "api_latency": 0.05, "comments_per_media": 50, "media_count": 15,
+                 "thumbnail_latency": 0.1, "model_latency": 0.5, "failure_rate": 0.0},
+    "heavy_comments": {"users": 8, "requests_per_user": 2, "accounts": None,
+                       "api_latency": 0.05, "comments_per_media": 1000, "media_count": 15,
+                       "thumbnail_latency": 0.1, "model_latency": 0.5, "failure_rate": 0.0},
+    "repeat_account": {"users": 8, "requests_per_user": 2, "accounts": 1,
+                       "api_latency": 0.05, "comments_per_media": 50, "media_count": 15,
+                       "thumbnail_latency": 0.1, "model_latency": 0.5, "failure_rate": 0.0},
+    "flaky_upstream": {"users": 8, "requests_per_user": 2, "accounts": None,
+                       "api_latency": 0.2, "comments_per_media": 50, "media_count": 15,
+                       "thumbnail_latency": 0.3, "model_latency": 2.0, "failure_rate": 0.02},
+}
+
+DEFAULT_OUTPUT = "loadtest_results.json"
+DEFAULT_WORKDIR = "loadtest_run"
+# How often a simulated user polls /jobs/<job_id>, and how long it waits at most
+POLL_SECONDS = 0.05
+REQUEST_TIMEOUT = 300
+# Resident memory is sampled this often; tracemalloc is only used where /proc is missing
+MEMORY_SAMPLE_SECONDS = 0.02
+_STATM = "/proc/self/statm"
+
+
+# Function to point the app at local stand-ins and fresh stores
+def install_stand_ins(app_module, settings, directory):
+    """
+    Replaces the Instagram client factory, the thumbnail HTTP session and the
+    prediction model of app_module with fakes built from settings, and gives the
+    scenario its own stores and job queue under directory (the caller has already
+    made directory the working directory, so relative cache paths land there too).
+    """
+    import thumbnails
+    from comment_store import CommentStore
+    from extract import ClientPool
+    from jobs import JobQueue
+    from results import ResultStore
+    from score_cache import ScoreCache
+
+    failure_rate = settings["failure_rate"]
+
+    def client_factory():
+        return FakeClient(latency=settings["api_latency"], comments_per_media=settings["comments_per_media"],
+                          media_count=settings["media_count"], failure_rate=failure_rate)
+
+    app_module.client_pool = ClientPool(client_factory, directory=os.path.join(directory, "sessions"))
+    app_module.prediction_backend = FakeModelBackend(latency=settings["model_latency"], failure_rate=failure_rate)
+    thumbnails.session = FakeHttpSession(latency=settings["thumbnail_latency"], failure_rate=failure_rate)
+    app_module.score_cache = ScoreCache(os.path.join(directory, "score_cache.sqlite3"), version=app_module.PIPELINE_VERSION)
+    app_module.comment_store = CommentStore(os.path.join(directory, "comment_store.sqlite3"))
+    app_module.result_store = ResultStore(os.path.join(directory, "results"))
+    app_module.job_queue = JobQueue(workers=app_module.ANALYSIS_WORKERS, directory=os.path.join(directory, "jobs"),
+                                    trace=app_module.TRACE_JOBS)
+
+# Peak memory of the process while a scenario runs
+class _MemoryPeak:
+    """
+    Samples resident memory from /proc/self/statm on a background thread, which costs
+    next to nothing. Without /proc (Windows, macOS) it uses tracemalloc instead, which
+    only counts Python allocations and slows allocation-heavy code down.
+    """
+
+    def __init__(self, interval=MEMORY_SAMPLE_SECONDS):
+        self.interval = interval
+        self.source = "rss" if os.path.exists(_STATM) else "tracemalloc"
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _rss(self):
+        with open(_STATM) as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self._rss())
+
+    def __enter__(self):
+        if self.source == "rss":
+            self.peak = self._rss()
+            self._thread = threading.Thread(target=self._sample, name="memory-sampler", daemon=True)
+            self._thread.start()
+        else:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.source == "rss":
+            self._stop.set()
+            self._thread.join()
+            self.peak = max(self.peak, self._rss())
+        else:
+            self.peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+# One simulated user: submit, poll until done, fetch the results page
+def _simulate_user(client, username, requests_per_user, results):
+    for _ in range(requests_per_user):
+        started = time.perf_counter()
+        outcome = {"username": username, "ok": False}
+        try:
+            response = client.post('/analyze', data={'username': username, 'password': 'loadtest'},
+                                   headers={'Accept': 'application/json'})
+            job_id = response.get_json()['job_id']
+            deadline = started + REQUEST_TIMEOUT
+            while True:
+                status = client.get(f'/jobs/{job_id}').get_json()
+                if status['status'] in ('done', 'failed') or time.perf_counter() > deadline:
+                    break
+                time.sleep(POLL_SECONDS)
+            # The page is fetched like a browser would, but success is the job's
+            # status: the page also depends on templates that are not part of the pipeline
+            outcome["page_status"] = client.get(f'/jobs/{job_id}/result').status_code
+            outcome["ok"] = status['status'] == 'done'
+            outcome["stages"] = status['stages']
+            if not outcome["ok"]:
+                outcome["error"] = status['error'] or f"job still {status['status']}"
+        except Exception as e:
+            outcome["error"] = f"{type(e).__name__}: {e}"
+        outcome["seconds"] = time.perf_counter() - started
+        results.append(outcome)
+
+def _percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 4), "p95": round(float(p95), 4), "p99": round(float(p99), 4)}
+
+# Run one scenario
+def run_scenario(app_module, name, settings, workdir, measure_memory=True):
+    """
+    Drives the app with settings["users"] concurrent users and returns latency
+    percentiles (submit to fetched results page), throughput, errors, mean stage
+    times and peak memory (see _MemoryPeak).
+    """
+    directory = os.path.abspath(os.path.join(workdir, name))
+    os.makedirs(directory, exist_ok=True)
+    os.chdir(directory)
+    install_stand_ins(app_module, settings, directory)
+
+    accounts = settings["accounts"] or settings["users"]
+    results = []
+    threads = [
+        threading.Thread(target=_simulate_user, name=f"user-{i}",
+                         args=(app_module.app.test_client(), f"loadtest_{i % accounts}",
+                               settings["requests_per_user"], results))
+        for i in range(settings["users"])
+    ]
+    memory = _MemoryPeak() if measure_memory else contextlib.nullcontext()
+    with memory:
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+    peak = memory.peak if measure_memory else None
+
+    succeeded = [result for result in results if result["ok"]]
+    stage_seconds = {}
+    for result in succeeded:
+        for stage in result["stages"]:
+            stage_seconds.setdefault(stage["name"], []).append(stage["seconds"])
+    errors = {}
+    pages = {}
+    for result in results:
+        if not result["ok"]:
+            errors[result["error"]] = errors.get(result["error"], 0) + 1
+        if "page_status" in result:
+            pages[str(result["page_status"])] = pages.get(str(result["page_status"]), 0) + 1
+
+    summary = {
+        "settings": settings,
+        "requests": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "wall_seconds": round(wall, 3),
+        "throughput_per_second": round(len(succeeded) / wall, 3) if wall else None,
+        "latency_seconds": _percentiles([result["seconds"] for result in succeeded]),
+        "stage_mean_seconds": {stage: round(float(np.mean(seconds)), 4) for stage, seconds in stage_seconds.items()},
+        "peak_memory_mb": round(peak / 2 ** 20, 1) if peak is not None else None,
+        "memory_source": memory.source if measure_memory else None,
+        "errors": errors,
+        "result_page_statuses": pages,
+    }
+    latency = summary["latency_seconds"]
+    print(f"{name:<16} {summary['succeeded']}/{summary['requests']} ok  "
+          f"p50 {latency['p50']}s  p95 {latency['p95']}s  p99 {latency['p99']}s  "
+          f"{summary['throughput_per_second']}/s  peak {summary['peak_memory_mb']} MB")
+    return summary
+
+# Run several scenarios against a fresh import of the app
+def run_load_test(scenarios=SCENARIOS, workdir=DEFAULT_WORKDIR, measure_memory=True):
+    """
+    Runs each scenario in turn and returns a JSON-ready dict. The app is imported
+    from inside workdir, so its caches, sessions and job files never touch the
+    real ones.
+    """
+    home = os.getcwd()
+    workdir = os.path.abspath(workdir)
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    try:
+        import app as app_module
+        from senti_analysis import warm_up
+
+        warm_up()
+        results = {name: run_scenario(app_module, name, settings, workdir, measure_memory)
+                   for name, settings in scenarios.items()}
+    finally:
+        os.chdir(home)
+    return {
+        'created_at': time.time(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'results': results,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent /analyze load test against local stand-ins")
+    parser.add_argument('--scenario', nargs='*', choices=sorted(SCENARIOS), default=list(SCENARIOS),
+                        help="scenarios to run (default: all)")
+    parser.add_argument('--users', type=int, help="override the concurrent users of every scenario")
+    parser.add_argument('--requests', type=int, help="override the analyses each user runs")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="where to write the JSON results")
+    parser.add_argument('--workdir', default=DEFAULT_WORKDIR, help="scratch directory for caches and job files")
+    parser.add_argument('--no-memory', action='store_true', help="do not measure peak memory")
+    args = parser.parse_args(argv)
+
+    scenarios = {}
+    for name in args.scenario:
+        settings = dict(SCENARIOS[name])
+        if args.users:
+            settings["users"] = args.users
+        if args.requests:
+            settings["requests_per_user"] = args.requests
+        scenarios[name] = settings
+
+    results = run_load_test(scenarios, args.workdir, measure_memory=not args.no_memory)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import threading
+import time
+from contextvars import ContextVar
+
+# Latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_lock = threading.Lock()
+_stages = {}
+
+# Spans of the request being traced in this context, or None when not tracing
+_trace = ContextVar("trace", default=None)
+
+
+class _StageStats:
+    def __init__(self):
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.items = 0
+        self.errors = 0
+
+    def observe(self, seconds, items, failed):
+        self.count += 1
+        self.total_seconds += seconds
+        self.items += items or 0
+        self.errors += int(failed)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+# Timed section of the pipeline
+class span:
+    """
+    Context manager recording wall time, item count and errors for a named stage:
+
+        with span("scoring") as s:
+            ...
+            s.items = len(data)
+
+    Every span feeds the process-wide histograms rendered by render_prometheus, and
+    is appended to the current trace if one was started with start_trace.
+    """
+
+    def __init__(self, name, items=None):
+        self.name = name
+        self.items = items
+        self.seconds = 0.0
+        self.error = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._started
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        with _lock:
+            stats = _stages.get(self.name)
+            if stats is None:
+                stats = _stages[self.name] = _StageStats()
+            stats.observe(self.seconds, self.items, exc is not None)
+        trace = _trace.get()
+        if trace is not None:
+            trace["spans"].append({
+                "name": self.name,
+                "start": round(self._started - trace["started"], 6),
+                "seconds": round(self.seconds, 6),
+                "items": self.items,
+                "error": self.error,
+            })
+        return False
+
+def start_trace():
+    """
+    Starts collecting spans for the current context and returns the trace dict.
+    """
+    trace = {"started": time.perf_counter(), "spans": []}
+    _trace.set(trace)
+    return trace
+
+def stop_trace():
+    _trace.set(None)
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# Prometheus text exposition of every stage seen so far
+def render_prometheus():
+    with _lock:
+        snapshot = {name: (list(s.bucket_counts), s.count, s.total_seconds, s.items, s.errors)
+                    for name, s in _stages.items()}
+    lines = [
+        "# HELP analysis_stage_duration_seconds Wall time of each analysis stage.",
+        "# TYPE analysis_stage_duration_seconds histogram",
+    ]
+    for name, (buckets, count, total, _, _) in sorted(snapshot.items()):
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS, buckets):
+            cumulative += bucket_count
+            lines.append(f'analysis_stage_duration_seconds_bucket{{stage="{_label(name)}",le="{bound}"}} {cumulative}')
+        lines.append(f'analysis_stage_duration_seconds_bucket{{stage="{_label(name)}",le="+Inf"}} {count}')
+        lines.append(f'analysis_stage_duration_seconds_sum{{stage="{_label(name)}"}} {total}')
+        lines.append(f'analysis_stage_duration_seconds_count{{stage="{_label(name)}"}} {count}')
+    lines += [
+        "# HELP analysis_stage_items_total Items (comments, posts, images) handled by each stage.",
+        "# TYPE analysis_stage_items_total counter",
+    ]
+    for name, (_, _, _, items, _) in sorted(snapshot.items()):
+        lines.append(f'analysis_stage_items_total{{stage="{_label(name)}"}} {items}')
+    lines += [
+        "# HELP analysis_stage_errors_total Stage runs that raised an exception.",
+        "# TYPE analysis_stage_errors_total counter",
+    ]
+    for name, (_, _, _, _, errors) in sorted(snapshot.items()):
+        lines.append(f'analysis_stage_errors_total{{stage="{_label(name)}"}} {errors}')
+    return "\n".join(lines) + "\n"
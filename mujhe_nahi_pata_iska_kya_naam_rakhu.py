@@ -1,147 +1,282 @@
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report
-from senti_analysis import process_dataset, preprocess_text, analyze_sentiment
-import pandas as pd
-
-def compare_sentiments(test_data, processed_data):
-    """
-    Compares sentiments excluding unknown labels and handles class imbalance
-    """
-    # Ensure textID is of the same type in both datasets
-    test_data['textID'] = test_data['textID'].astype(str)
-    processed_data['textID'] = processed_data['textID'].astype(str)
-
-    # Merge datasets on 'textID'
-    merged_data = pd.merge(
-        test_data[['textID', 'sentiment']],
-        processed_data[['textID', 'Sentiment_Class']],
-        on='textID',
-        how='inner'
-    )
-
-    # Standardize values for comparison
-    merged_data['sentiment'] = merged_data['sentiment'].fillna("unknown").str.strip().str.lower()
-    merged_data['Sentiment_Class'] = merged_data['Sentiment_Class'].fillna("unknown").str.strip().str.lower()
-
-    # Filter out rows with unknown sentiment in ground truth
-    known_sentiments = merged_data[merged_data['sentiment'] != 'unknown'].copy()
-    
-    if known_sentiments.empty:
-        raise ValueError("No known sentiment labels found in the data")
-
-    print("\nData distribution before filtering unknowns:")
-    print("Total rows:", len(merged_data))
-    print("Ground truth sentiment distribution:", merged_data['sentiment'].value_counts().to_dict())
-    print("Predicted sentiment distribution:", merged_data['Sentiment_Class'].value_counts().to_dict())
-
-    print("\nData distribution after filtering unknowns:")
-    print("Total rows:", len(known_sentiments))
-    print("Ground truth sentiment distribution:", known_sentiments['sentiment'].value_counts().to_dict())
-    print("Predicted sentiment distribution:", known_sentiments['Sentiment_Class'].value_counts().to_dict())
-
-    # Get ground truth and predictions
-    y_true = known_sentiments['sentiment']
-    y_pred = known_sentiments['Sentiment_Class']
-
-    # Calculate metrics
-    try:
-        accuracy = accuracy_score(y_true, y_pred)
-        precision = precision_score(y_true, y_pred, average='weighted')
-        recall = recall_score(y_true, y_pred, average='weighted')
-        f1 = f1_score(y_true, y_pred, average='weighted')
-
-        print("\nDetailed Classification Report (excluding unknown labels):")
-        print(classification_report(y_true, y_pred))
-        
-        print("\nOverall Metrics (excluding unknown labels):")
-        print(f"Accuracy: {accuracy:.4f}")
-        print(f"Precision: {precision:.4f}")
-        print(f"Recall: {recall:.4f}")
-        print(f"F1 Score: {f1:.4f}")
-
-        # Print confusion matrix samples
-        print("\nSample of misclassifications:")
-        misclassified = known_sentiments[y_true != y_pred].head(10)
-        print(misclassified[['textID', 'sentiment', 'Sentiment_Class']])
-
-        return accuracy, precision, recall, f1
-
-    except Exception as e:
-        print(f"Error calculating metrics: {str(e)}")
-        return 0, 0, 0, 0
-
-def process_dataset(file_path):
-    """
-    Process dataset with improved sentiment handling
-    """
-    data = pd.read_csv(file_path)
-    print(f"Loaded {len(data)} rows from {file_path}")
-    
-    # Ensure text column is string and handle NaN values
-    data['text'] = data['text'].fillna('').astype(str)
-    
-    # Preprocess text
-    print("Preprocessing text...")
-    data['Cleaned_Text'] = data['text'].apply(lambda x: safe_preprocess_text(x))
-    
-    # Perform sentiment analysis
-    print("Performing sentiment analysis...")
-    sentiment_classes = []
-    
-    for comment in data['Cleaned_Text']:
-        try:
-            compound, sentiment = analyze_sentiment(comment)
-            # Map empty or invalid sentiments to neutral
-            sentiment = sentiment if sentiment in ['positive', 'negative', 'neutral'] else 'neutral'
-            sentiment_classes.append(sentiment)
-        except Exception as e:
-            print(f"Error in sentiment analysis: {str(e)}")
-            sentiment_classes.append('neutral')  # default fallback
-    
-    data['Sentiment_Class'] = sentiment_classes
-    
-    print("\nSentiment Distribution in processed data:")
-    print(data['Sentiment_Class'].value_counts(normalize=True).multiply(100).round(2))
-    
-    return data[['textID', 'text', 'Sentiment_Class']]
-
-def safe_preprocess_text(text):
-    """
-    Safely preprocess text with better error handling
-    """
-    try:
-        if pd.isna(text) or text == '':
-            return ''
-        return preprocess_text(str(text))
-    except Exception as e:
-        print(f"Error preprocessing text: {str(e)}")
-        return ''
-
-def main():
-    """
-    Main workflow with improved error handling
-    """
-    try:
-        test_file_path = "test.csv"
-        processed_file_path = "processed_test_comments_by_model.csv"
-
-        # Process and export the dataset
-        print("Processing dataset...")
-        processed_data = process_dataset(test_file_path)
-        
-        print("Exporting processed data...")
-        processed_data.to_csv(processed_file_path, index=False, encoding='utf-8')
-        
-        # Load datasets for comparison
-        print("Loading datasets for comparison...")
-        test_data = pd.read_csv(test_file_path)
-        processed_data = pd.read_csv(processed_file_path)
-        
-        # Compare sentiments
-        print("Comparing sentiments...")
-        compare_sentiments(test_data, processed_data)
-        
-    except Exception as e:
-        print(f"Error in main workflow: {str(e)}")
-
-if __name__ == "__main__":
-    main()
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report
+from senti_analysis import process_dataset, preprocess_text, analyze_sentiment, score_texts, score_comments, PIPELINE_VERSION
+from score_cache import ScoreCache
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import sys
+
+# Labelled datasets evaluated by the threshold sweep
+EVAL_FILES = ["test.csv", "idktest.csv"]
+SWEEP_RESULTS_PATH = "threshold_sweep.csv"
+
+# Class codes used by the sweep: negative, neutral, positive
+CLASSES = ['negative', 'neutral', 'positive']
+
+def compare_sentiments(test_data, processed_data):
+    """
+    Compares sentiments excluding unknown labels and handles class imbalance
+    """
+    # Ensure textID is of the same type in both datasets
+    test_data['textID'] = test_data['textID'].astype(str)
+    processed_data['textID'] = processed_data['textID'].astype(str)
+
+    # Merge datasets on 'textID'
+    merged_data = pd.merge(
+        test_data[['textID', 'sentiment']],
+        processed_data[['textID', 'Sentiment_Class']],
+        on='textID',
+        how='inner'
+    )
+
+    # Standardize values for comparison
+    merged_data['sentiment'] = merged_data['sentiment'].fillna("unknown").str.strip().str.lower()
+    merged_data['Sentiment_Class'] = merged_data['Sentiment_Class'].fillna("unknown").str.strip().str.lower()
+
+    # Filter out rows with unknown sentiment in ground truth
+    known_sentiments = merged_data[merged_data['sentiment'] != 'unknown'].copy()
+    
+    if known_sentiments.empty:
+        raise ValueError("No known sentiment labels found in the data")
+
+    print("\nData distribution before filtering unknowns:")
+    print("Total rows:", len(merged_data))
+    print("Ground truth sentiment distribution:", merged_data['sentiment'].value_counts().to_dict())
+    print("Predicted sentiment distribution:", merged_data['Sentiment_Class'].value_counts().to_dict())
+
+    print("\nData distribution after filtering unknowns:")
+    print("Total rows:", len(known_sentiments))
+    print("Ground truth sentiment distribution:", known_sentiments['sentiment'].value_counts().to_dict())
+    print("Predicted sentiment distribution:", known_sentiments['Sentiment_Class'].value_counts().to_dict())
+
+    # Get ground truth and predictions
+    y_true = known_sentiments['sentiment']
+    y_pred = known_sentiments['Sentiment_Class']
+
+    # Calculate metrics
+    try:
+        accuracy = accuracy_score(y_true, y_pred)
+        precision = precision_score(y_true, y_pred, average='weighted')
+        recall = recall_score(y_true, y_pred, average='weighted')
+        f1 = f1_score(y_true, y_pred, average='weighted')
+
+        print("\nDetailed Classification Report (excluding unknown labels):")
+        print(classification_report(y_true, y_pred))
+        
+        print("\nOverall Metrics (excluding unknown labels):")
+        print(f"Accuracy: {accuracy:.4f}")
+        print(f"Precision: {precision:.4f}")
+        print(f"Recall: {recall:.4f}")
+        print(f"F1 Score: {f1:.4f}")
+
+        # Print confusion matrix samples
+        print("\nSample of misclassifications:")
+        misclassified = known_sentiments[y_true != y_pred].head(10)
+        print(misclassified[['textID', 'sentiment', 'Sentiment_Class']])
+
+        return accuracy, precision, recall, f1
+
+    except Exception as e:
+        print(f"Error calculating metrics: {str(e)}")
+        return 0, 0, 0, 0
+
+def process_dataset(file_path, workers=1):
+    """
+    Process dataset with improved sentiment handling
+    Pass workers > 1 to preprocess and score in a process pool
+    """
+    # Tab-separated, with labels normalised and text as strings
+    data = load_labelled(file_path)
+    print(f"Loaded {len(data)} rows from {file_path}")
+    
+    if workers > 1:
+        print(f"Preprocessing and scoring text with {workers} workers...")
+        results = score_texts(data['text'], workers)
+        data['Cleaned_Text'] = [cleaned for cleaned, _, _ in results]
+        data['Sentiment_Class'] = [sentiment for _, _, sentiment in results]
+        print("\nSentiment Distribution in processed data:")
+        print(data['Sentiment_Class'].value_counts(normalize=True).multiply(100).round(2))
+        return data[['textID', 'text', 'Sentiment_Class']]
+
+    # Preprocess text
+    print("Preprocessing text...")
+    data['Cleaned_Text'] = data['text'].apply(lambda x: safe_preprocess_text(x))
+    
+    # Perform sentiment analysis
+    print("Performing sentiment analysis...")
+    sentiment_classes = []
+    
+    for comment in data['Cleaned_Text']:
+        try:
+            compound, sentiment = analyze_sentiment(comment)
+            # Map empty or invalid sentiments to neutral
+            sentiment = sentiment if sentiment in ['positive', 'negative', 'neutral'] else 'neutral'
+            sentiment_classes.append(sentiment)
+        except Exception as e:
+            print(f"Error in sentiment analysis: {str(e)}")
+            sentiment_classes.append('neutral')  # default fallback
+    
+    data['Sentiment_Class'] = sentiment_classes
+    
+    print("\nSentiment Distribution in processed data:")
+    print(data['Sentiment_Class'].value_counts(normalize=True).multiply(100).round(2))
+    
+    return data[['textID', 'text', 'Sentiment_Class']]
+
+def safe_preprocess_text(text):
+    """
+    Safely preprocess text with better error handling
+    """
+    try:
+        if pd.isna(text) or text == '':
+            return ''
+        return preprocess_text(str(text))
+    except Exception as e:
+        print(f"Error preprocessing text: {str(e)}")
+        return ''
+
+def load_labelled(file_path):
+    """
+    Loads a tab-separated labelled dataset, normalising padded labels like " Positive ".
+    Rows written one column to the left (text under "Unnamed: 0", the label under
+    "text", as in most of idktest.csv) are moved back into place. Rows whose label is
+    not positive/neutral/negative are dropped.
+    """
+    data = pd.read_csv(file_path, sep='\t', encoding='utf-8', encoding_errors='replace')
+    data['text'] = data['text'].fillna('').astype(str)
+    data['sentiment'] = data['sentiment'].fillna('unknown').astype(str).str.strip().str.lower()
+    if 'Unnamed: 0' in data.columns:
+        shifted = (data['text'].str.strip().str.lower().isin(CLASSES)
+                   & ~data['sentiment'].isin(CLASSES) & data['Unnamed: 0'].notna())
+        data.loc[shifted, 'sentiment'] = data.loc[shifted, 'text'].str.strip().str.lower()
+        data.loc[shifted, 'text'] = data.loc[shifted, 'Unnamed: 0'].astype(str)
+        if shifted.any():
+            print(f"{file_path}: {shifted.sum()} rows were shifted one column and have been realigned")
+    known = data[data['sentiment'].isin(CLASSES)].copy()
+    print(f"{file_path}: {len(known)} of {len(data)} rows have a positive/neutral/negative label")
+    return known
+
+def compound_scores(texts, cache_path="score_cache.sqlite3", workers=1):
+    """
+    Scores texts once; the compound scores are kept in the shared ScoreCache, so later
+    sweeps of the same dataset never rescore. With workers > 1 the scoring runs in a
+    process pool, but only this process opens the cache.
+    """
+    cache = ScoreCache(cache_path, version=PIPELINE_VERSION)
+    try:
+        _, scores, _ = score_comments(texts, cache, workers)
+    finally:
+        cache.close()
+    return scores
+
+def sweep_thresholds(scores, labels, positive_thresholds, negative_thresholds, block=64):
+    """
+    Evaluates every (positive, negative) threshold pair with vectorised comparisons
+    and returns accuracy plus weighted precision, recall and F1 (as sklearn computes
+    them) per pair. A score is positive above the positive threshold and negative
+    below the negative one, like analyze_sentiment.
+    """
+    scores = np.asarray(scores, dtype=float)
+    y_true = pd.Categorical(labels, categories=CLASSES).codes.astype(np.int64)
+    pairs = np.array([(p, n) for p in positive_thresholds for n in negative_thresholds], dtype=float)
+    n_classes = len(CLASSES)
+    support = np.bincount(y_true, minlength=n_classes)
+
+    confusion = []
+    for start in range(0, len(pairs), block):
+        chunk = pairs[start:start + block]
+        y_pred = np.ones((len(chunk), len(scores)), dtype=np.int64)
+        y_pred[scores[None, :] > chunk[:, :1]] = 2
+        y_pred[scores[None, :] < chunk[:, 1:]] = 0
+        flat = (np.arange(len(chunk))[:, None] * n_classes + y_true[None, :]) * n_classes + y_pred
+        confusion.append(np.bincount(flat.ravel(), minlength=len(chunk) * n_classes * n_classes)
+                         .reshape(len(chunk), n_classes, n_classes))
+    confusion = np.concatenate(confusion)
+
+    true_positive = confusion[:, np.arange(n_classes), np.arange(n_classes)].astype(float)
+    predicted = confusion.sum(axis=1).astype(float)
+    precision = np.divide(true_positive, predicted, out=np.zeros_like(true_positive), where=predicted > 0)
+    recall = true_positive / np.maximum(support, 1)
+    denominator = precision + recall
+    f1 = np.divide(2 * precision * recall, denominator, out=np.zeros_like(denominator), where=denominator > 0)
+    weights = support / max(support.sum(), 1)
+
+    return pd.DataFrame({
+        'positive_threshold': pairs[:, 0],
+        'negative_threshold': pairs[:, 1],
+        'accuracy': true_positive.sum(axis=1) / max(len(scores), 1),
+        'precision': precision @ weights,
+        'recall': recall @ weights,
+        'f1': f1 @ weights,
+    })
+
+def evaluate_file(file_path, positive_thresholds, negative_thresholds):
+    data = load_labelled(file_path)
+    scores = compound_scores(data['text'])
+    results = sweep_thresholds(scores, data['sentiment'], positive_thresholds, negative_thresholds)
+    results.insert(0, 'dataset', file_path)
+    return results
+
+def threshold_sweep(files=EVAL_FILES, positive_thresholds=None, negative_thresholds=None, workers=2):
+    """
+    Scores each dataset once and evaluates the whole threshold grid on each, one
+    process per file. The scoring happens here (its own pool of `workers` processes)
+    so the score cache has a single writer. Returns one DataFrame for all datasets.
+    """
+    if positive_thresholds is None:
+        positive_thresholds = np.round(np.arange(0.0, 0.61, 0.05), 2)
+    if negative_thresholds is None:
+        negative_thresholds = -np.round(np.arange(0.0, 0.61, 0.05), 2)
+    datasets = [load_labelled(file_path) for file_path in files]
+    scores = [compound_scores(data['text'], workers=workers) for data in datasets]
+    with ProcessPoolExecutor(max_workers=len(files)) as pool:
+        results = list(pool.map(sweep_thresholds, scores, [data['sentiment'] for data in datasets],
+                                [positive_thresholds] * len(files), [negative_thresholds] * len(files)))
+    for file_path, result in zip(files, results):
+        result.insert(0, 'dataset', file_path)
+    return pd.concat(results, ignore_index=True)
+
+def sweep_main():
+    """
+    Runs the threshold sweep, saves it and prints the best pairs per dataset.
+    """
+    results = threshold_sweep()
+    results.to_csv(SWEEP_RESULTS_PATH, index=False)
+    print(f"Threshold sweep written to {SWEEP_RESULTS_PATH}")
+    for dataset, group in results.groupby('dataset'):
+        print(f"\nBest thresholds for {dataset} (by F1):")
+        print(group.sort_values('f1', ascending=False).head(5).to_string(index=False))
+
+def main(workers=1):
+    """
+    Main workflow with improved error handling
+    """
+    try:
+        test_file_path = "test.csv"
+        processed_file_path = "processed_test_comments_by_model.csv"
+
+        # Process and export the dataset
+        print("Processing dataset...")
+        processed_data = process_dataset(test_file_path, workers)
+        
+        print("Exporting processed data...")
+        processed_data.to_csv(processed_file_path, index=False, encoding='utf-8')
+        
+        # Load datasets for comparison
+        print("Loading datasets for comparison...")
+        test_data = load_labelled(test_file_path)
+        processed_data = pd.read_csv(processed_file_path)
+        
+        # Compare sentiments
+        print("Comparing sentiments...")
+        compare_sentiments(test_data, processed_data)
+        
+    except Exception as e:
+        print(f"Error in main workflow: {str(e)}")
+
+if __name__ == "__main__":
+    # "sweep" evaluates a grid of thresholds; otherwise the optional argument is the number of worker processes
+    if len(sys.argv) > 1 and sys.argv[1] == "sweep":
+        sweep_main()
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 1)
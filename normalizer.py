@@ -0,0 +1,118 @@
+import re
+import sys
+from functools import lru_cache
+
+import emoji
+from emoji.unicode_codes import EMOJI_DATA
+
+# Upper bound on distinct emoji runs memoized by the normalizer
+EMOJI_RUN_CACHE_SIZE = 50000
+
+# Characters the tokenizer in emoji.demojize can act on: anything that appears in an
+# emoji sequence, plus the zero-width joiner and the variation selectors it drops
+_EMOJI_CHARS = set("".join(EMOJI_DATA)) | {"\u200d", "\ufe0e", "\ufe0f"}
+
+def _character_class(chars):
+    # Contiguous code points are merged into ranges, which keeps the compiled class small
+    codes = sorted(ord(char) for char in chars)
+    ranges = []
+    for code in codes:
+        if ranges and ranges[-1][1] == code - 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    return "[" + "".join(re.escape(chr(low)) if low == high else f"{re.escape(chr(low))}-{re.escape(chr(high))}"
+                         for low, high in ranges) + "]"
+
+
+# Character class table for the final stripping step
+class _KeepTable(dict):
+    """
+    str.translate table equivalent to re.sub(r'_', ' ') followed by
+    re.sub(r'[^a-zA-Z\\s#]', ''): underscores become spaces, ASCII letters, '#' and
+    whitespace are kept, everything else is deleted. Entries are filled in the first
+    time a character is seen.
+    """
+
+    def __missing__(self, code):
+        char = chr(code)
+        if char == "_":
+            value = " "
+        elif ("a" <= char <= "z") or ("A" <= char <= "Z") or char == "#" or char.isspace():
+            value = code
+        else:
+            value = None
+        self[code] = value
+        return value
+
+# Normalization engine behind clean_text
+class TextNormalizer:
+    """
+    Lowercases, demojizes, replaces underscores and strips non-alphabetic characters
+    in one pass per comment, with the same output as clean_text.
+
+    Emoji are translated by emoji.demojize itself, so its matching rules (longest
+    sequence without backtracking, ZWJ handling) are kept exactly; a precompiled
+    pattern finds the runs of emoji characters, and each distinct run is translated
+    once and memoized. Text without any non-ASCII character skips this step, since
+    every emoji sequence contains one.
+    """
+
+    def __init__(self, cache_size=EMOJI_RUN_CACHE_SIZE):
+        self.emoji_run = re.compile(_character_class(_EMOJI_CHARS) + "+")
+        self.keep = _KeepTable()
+        self._demojize_run = lru_cache(maxsize=cache_size)(self._demojize)
+
+    @staticmethod
+    def _demojize(run):
+        if run.isascii():
+            return run
+        return emoji.demojize(run, delimiters=(" ", " "))
+
+    def _replace_run(self, match):
+        return self._demojize_run(match.group())
+
+    def clean(self, text):
+        """
+        Returns the cleaned form of one comment.
+        """
+        if not isinstance(text, str):
+            text = str(text)
+        text = text.lower()
+        if not text.isascii():
+            text = self.emoji_run.sub(self._replace_run, text)
+        return text.translate(self.keep).strip()
+
+    def clean_batch(self, texts):
+        """
+        Returns the cleaned form of each comment in texts, cleaning repeated comments once.
+        """
+        seen = {}
+        cleaned = []
+        for text in texts:
+            try:
+                result = seen[text]
+            except KeyError:
+                result = seen[text] = self.clean(text)
+            except TypeError:
+                # Unhashable input, e.g. a list
+                result = self.clean(text)
+            cleaned.append(result)
+        return cleaned
+
+if __name__ == "__main__":
+    # Equivalence check against clean_text: python normalizer.py [dataset.csv ...]
+    import pandas as pd
+    from senti_analysis import clean_text
+
+    normalizer = TextNormalizer()
+    mismatches = 0
+    for path in sys.argv[1:] or ["test.csv", "idktest.csv"]:
+        texts = pd.read_csv(path, sep='\t', encoding='utf-8', encoding_errors='replace')['text'].fillna('').astype(str).tolist()
+        for text, fast in zip(texts, normalizer.clean_batch(texts)):
+            if fast.encode("utf-8") != clean_text(text).encode("utf-8"):
+                mismatches += 1
+                print(f"Mismatch: {text!r}")
+        print(f"{path}: checked {len(texts)} comments")
+    print(f"{mismatches} mismatches")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,82 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+try:
+    import pyarrow  # optional: enables the Parquet and Feather formats
+except ImportError:
+    pyarrow = None
+
+# Default on-disk format for processed frames
+PERSIST_FORMAT = "parquet"
+
+_extensions = {"parquet": ".parquet", "feather": ".feather", "csv": ".csv"}
+
+# A single background writer keeps saves ordered and off the request path
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persist")
+
+
+def _resolve_format(fmt):
+    if fmt in ("parquet", "feather") and pyarrow is None:
+        print(f"pyarrow is not installed, saving as CSV instead of {fmt}")
+        return "csv"
+    return fmt
+
+# Save a frame in a columnar format
+def save_frame(data, base_path, fmt=PERSIST_FORMAT):
+    """
+    Writes data to base_path plus the format's extension and returns the path.
+    Object columns holding mixed types are stored as strings so Arrow accepts them.
+    """
+    fmt = _resolve_format(fmt)
+    path = base_path + _extensions[fmt]
+    if fmt == "csv":
+        data.to_csv(path, index=False, encoding='utf-8')
+        return path
+
+    data = data.copy()
+    for column in data.columns:
+        if data[column].dtype == object:
+            data[column] = data[column].astype(str)
+    if fmt == "parquet":
+        data.to_parquet(path, index=False)
+    else:
+        data.reset_index(drop=True).to_feather(path)
+    return path
+
+def _report(future):
+    error = future.exception()
+    if error is not None:
+        print(f"Error persisting frame: {error}")
+    else:
+        print(f"Data persisted to {future.result()}")
+
+# Save a frame without blocking the caller
+def save_frame_async(data, base_path, fmt=PERSIST_FORMAT):
+    """
+    Queues a snapshot of data for save_frame on the background writer and returns the future.
+    """
+    future = _writer.submit(save_frame, data.copy(), base_path, fmt)
+    future.add_done_callback(_report)
+    return future
+
+# Load the most recent frame saved under base_path, whatever its format
+def load_frame(base_path):
+    """
+    Returns the newest of base_path.parquet / .feather / .csv, or None if none exists.
+    """
+    candidates = [
+        (os.path.getmtime(base_path + extension), fmt)
+        for fmt, extension in _extensions.items()
+        if os.path.exists(base_path + extension)
+    ]
+    if not candidates:
+        return None
+    _, fmt = max(candidates)
+    path = base_path + _extensions[fmt]
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    if fmt == "feather":
+        return pd.read_feather(path)
+    return pd.read_csv(path)
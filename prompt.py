@@ -1,17 +1,110 @@
-import google.generativeai as genai
-import PIL.Image
-
-def give_prediction_on_the_next_post():
-    sample_file_2 = PIL.Image.open(f'static\\top_1.jpg')
-    sample_file_3 = PIL.Image.open(f'static\\top_2.jpg')
-    sample_file_1 = PIL.Image.open(f'static\\top_3.jpg')
-
-    genai.configure(api_key="your google API key")
-
-    #myfile = genai.upload_file(path="temp_image.jpeg")
-    #print(f"{myfile=}")
-    prompt="These are the top performaing posts of my instagram, give me a plan for the next five days on what should I post based on what people will like if they have been liking these three posts the best. Keep it short but informative" 
-
-    model = genai.GenerativeModel("gemini-1.5-flash")
-    response = model.generate_content([prompt, sample_file_2, sample_file_3, sample_file_1])
-    return response.text
+import google.generativeai as genai
+import PIL.Image
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from thumbnails import evict_lru
+
+PROMPT = "These are the top performaing posts of my instagram, give me a plan for the next five days on what should I post based on what people will like if they have been liking these three posts the best. Keep it short but informative"
+MODEL_NAME = "gemini-1.5-flash"
+PREDICTION_TIMEOUT = 30
+PREDICTION_CACHE_DIR = "prediction_cache"
+# Cached predictions past this size are evicted, least recently used first
+PREDICTION_CACHE_BYTES = 5 * 1024 * 1024
+FALLBACK_TEXT = "We couldn't generate a plan for your next posts right now. Please try again in a few minutes."
+
+# Prediction calls run here so they can overlap with plotting
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prediction")
+
+
+# Default model backend: Google Gemini
+class GeminiBackend:
+    """
+    Any object with generate(prompt, images) -> str can replace it, e.g. a local stub in tests.
+    """
+
+    def __init__(self, api_key=None, model_name=MODEL_NAME):
+        genai.configure(api_key=api_key or os.environ.get("GOOGLE_API_KEY", "your google API key"))
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt, images):
+        response = self.model.generate_content([prompt, *images])
+        return response.text
+
+_default_backend = None
+
+def get_default_backend():
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = GeminiBackend()
+    return _default_backend
+
+def top_image_paths(image_dir):
+    return [os.path.join(image_dir, f'top_{i}.jpg') for i in (1, 2, 3)]
+
+# Cache key for a prediction
+def prediction_key(image_paths, prompt=PROMPT):
+    """
+    Hashes the prompt and the bytes of the top-post images.
+    """
+    digest = hashlib.sha256(prompt.encode("utf-8"))
+    for path in image_paths:
+        with open(path, "rb") as file:
+            digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+def _cached_prediction(key):
+    path = os.path.join(PREDICTION_CACHE_DIR, key + ".txt")
+    try:
+        with open(path, encoding="utf-8") as file:
+            text = file.read()
+        os.utime(path)  # mark as recently used for eviction
+        return text
+    except OSError:
+        return None
+
+def _store_prediction(key, text):
+    os.makedirs(PREDICTION_CACHE_DIR, exist_ok=True)
+    with open(os.path.join(PREDICTION_CACHE_DIR, key + ".txt"), "w", encoding="utf-8") as file:
+        file.write(text)
+    evict_lru(PREDICTION_CACHE_DIR, PREDICTION_CACHE_BYTES)
+
+def _predict(image_dir, backend, prompt):
+    paths = top_image_paths(image_dir)
+    key = prediction_key(paths, prompt)
+    cached = _cached_prediction(key)
+    if cached is not None:
+        print("Top posts unchanged, reusing cached prediction...")
+        return cached
+    images = [PIL.Image.open(path) for path in paths]
+    text = (backend or get_default_backend()).generate(prompt, images)
+    _store_prediction(key, text)
+    return text
+
+# Start a prediction without waiting for it
+def start_prediction(image_dir="static", backend=None, prompt=PROMPT):
+    """
+    Submits the prediction to a background thread and returns a future, so the caller
+    can plot meanwhile and collect it with wait_for_prediction.
+    """
+    return _executor.submit(_predict, image_dir, backend, prompt)
+
+def wait_for_prediction(future, timeout=PREDICTION_TIMEOUT, started=None):
+    """
+    Returns the prediction text, or FALLBACK_TEXT if it fails or is not ready within
+    timeout seconds of `started` (default: now). A late response still lands in the cache.
+    """
+    if started is not None:
+        timeout = max(0.0, timeout - (time.monotonic() - started))
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        print("Prediction timed out, using fallback text")
+    except Exception as e:
+        print(f"Error generating prediction: {e}")
+    return FALLBACK_TEXT
+
+def give_prediction_on_the_next_post(image_dir="static", backend=None, timeout=PREDICTION_TIMEOUT):
+    return wait_for_prediction(start_prediction(image_dir, backend), timeout)
@@ -0,0 +1,79 @@
+import heapq
+import itertools
+import sys
+
+
+# Streaming top-k
+class TopK:
+    """
+    Keeps the k highest-scoring items pushed so far (or the k lowest with
+    largest=False) in a bounded heap: O(log k) per push and O(k) memory, so a
+    ranking over any number of posts never needs a full sort. On equal scores the
+    item pushed first wins, or the one pushed last with later_wins=True.
+    """
+
+    def __init__(self, k, largest=True, later_wins=False):
+        self.k = k
+        self.largest = largest
+        self.later_wins = later_wins
+        self._heap = []
+        self._order = itertools.count()
+
+    def push(self, score, item):
+        if self.k <= 0 or score != score:  # NaN scores are not ranked
+            return
+        # The heap root is the weakest kept entry; ties favour the earlier push
+        # unless later_wins
+        order = next(self._order)
+        entry = (score if self.largest else -score, order if self.later_wins else -order, item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def items(self):
+        """
+        Returns [(score, item)], best first.
+        """
+        ordered = sorted(self._heap, key=lambda entry: entry[:2], reverse=True)
+        return [(key if self.largest else -key, item) for key, _, item in ordered]
+
+    def __len__(self):
+        return len(self._heap)
+
+# Positions of the top and bottom k scores
+def extreme_positions(scores, k):
+    """
+    Returns (top, bottom): the positions that a stable descending sort of scores
+    followed by head(k) / tail(k) would pick, in the same order. On ties, head keeps
+    the earliest positions and tail the latest, both listed in position order.
+    NaN scores are skipped.
+    """
+    best, worst = TopK(k), TopK(k, largest=False, later_wins=True)
+    for position, score in enumerate(scores):
+        best.push(score, position)
+        worst.push(score, position)
+    # worst.items() runs from the lowest score (latest position first on ties), so
+    # reversed it is the tail of the descending sort
+    return [position for _, position in best.items()], [position for _, position in reversed(worst.items())]
+
+if __name__ == "__main__":
+    # Equivalence check against a stable sort: python ranking.py [frames]
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    mismatches = 0
+    for _ in range(frames):
+        size = int(rng.integers(0, 12))
+        k = int(rng.integers(0, 5))
+        # Few distinct values, so most frames have ties (zero-weight posts all score 0)
+        scores = pd.Series(rng.choice([0.0, 0.1, 0.5, -0.3, 0.9], size=size))
+        ordered = scores.sort_values(ascending=False, kind='stable')
+        expected = (list(ordered.head(k).index), list(ordered.tail(k).index))
+        if extreme_positions(scores.to_numpy(), k) != expected:
+            mismatches += 1
+            print(f"Mismatch for k={k}: {scores.tolist()}")
+    print(f"{frames} frames checked, {mismatches} mismatches")
+    sys.exit(1 if mismatches else 0)
@@ -1,145 +1,188 @@
-from instagrapi import Client
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.offsetbox import OffsetImage, AnnotationBbox
-import requests
-from io import BytesIO
-import numpy 
-from prompt import give_prediction_on_the_next_post
-
-# Login to Instagram
-def insta_login(username, password):
-    print("Logging in...")
-    cl = Client()
-    cl.login(username, password)
-    return cl
-
-# Fetch thumbnail URL for a media ID
-def fetch_thumbnail_url(cl, media_id):
-    """
-    Fetches the thumbnail URL for a given media ID.
-    """
-    try:
-        media_info = cl.media_info(media_id)
-        return media_info.thumbnail_url
-    except Exception as e:
-        print(f"Error fetching thumbnail for media_id {media_id}: {e}")
-        return None
-
-# Aggregate sentiment scores
-def aggregate_scores(data):
-    """
-    Groups comments by media_id and calculates a weighted average of sentiment scores.
-    Handles missing or invalid values in Cleaned_Comment.
-    """
-    data['Cleaned_Comment'] = data['Cleaned_Comment'].fillna("").astype(str)
-    data['Weight'] = data['Cleaned_Comment'].str.split().apply(len)
-
-    aggregated_scores = []
-    media_ids = []
-
-    for media_id, group in data.groupby('media_id'):
-        total_weighted_score = (group['Sentiment_Score'] * group['Weight']).sum()
-        total_weight = group['Weight'].sum()
-        if total_weight > 0:
-            aggregate_score = total_weighted_score / total_weight
-        else:
-            aggregate_score = 0
-        aggregated_scores.append(aggregate_score)
-        media_ids.append(media_id)
-
-    return pd.DataFrame({'media_id': media_ids, 'Aggregate_Score': aggregated_scores})
-
-# Find top 3 and worst 3 posts
-def find_top_and_worst_posts(aggregated_data):
-    """
-    Finds the top 3 and worst 3 posts based on aggregate sentiment scores.
-    """
-    sorted_data = aggregated_data.sort_values(by='Aggregate_Score', ascending=False)
-    top_3 = sorted_data.head(3)
-    worst_3 = sorted_data.tail(3)
-    return top_3, worst_3
-
-# Plot graph with thumbnails
-def plot_graph_with_thumbnails(aggregated_data, cl):
-    """
-    Plots Post IDs vs Aggregate Sentiment Scores with thumbnails displayed at graph points.
-    """
-    fig, ax = plt.subplots(figsize=(12, 8))
-
-    # Plot the sentiment scores
-    ax.scatter(aggregated_data['media_id'], aggregated_data['Aggregate_Score'], color='blue', s=100)
-    ax.set_title('Post Sentiment Analysis', fontsize=16)
-    ax.set_xlabel('Media ID', fontsize=12)
-    ax.set_ylabel('Aggregate Sentiment Score', fontsize=12)
-
-    # Add thumbnails to graph points
-    for i, row in aggregated_data.iterrows():
-        media_id = row['media_id']
-        score = row['Aggregate_Score']
-        thumbnail_url = fetch_thumbnail_url(cl, media_id)
-        if thumbnail_url:
-            try:
-                response = requests.get(thumbnail_url, stream=True)
-                print("hellloooooooo")
-                img = plt.imread(BytesIO(response.content), format='jpeg')
-                imagebox = OffsetImage(img, zoom=0.05)
-                ab = AnnotationBbox(imagebox, (i, score), frameon=False)
-                ax.add_artist(ab)
-            except Exception as e:
-                print(f"Error displaying thumbnail for media_id {media_id}: {e}")
-    
-
-    plt.xticks(rotation=90)
-    plt.tight_layout()
-    print("Saving graph with thumbnails...")
-    plt.savefig("static\\graph_with_thumbnails.png")
-    plt.close(fig)
-
-def save_images_to_local_via_media_id(cl, media_ids):
-    i=3
-    for media_id in media_ids:
-        thumbnail_url = fetch_thumbnail_url(cl, media_id)
-        if thumbnail_url:
-            try:
-                response = requests.get(thumbnail_url, stream=True)
-                img = plt.imread(BytesIO(response.content), format='jpeg')
-                plt.imsave(f"static\\top_{i}.jpg", img)
-                i=i-1
-            except Exception as e:
-                print(f"Error saving thumbnail for media_id {media_id}: {e}")
-
-# Main function
-def main():
-    
-
-    # Load processed sentiment data
-    data = pd.read_csv('processed_comments.csv')
-
-    # Aggregate sentiment scores
-    aggregated_data = aggregate_scores(data)
-
-    # Find the top 3 and worst 3 posts
-    top_3, worst_3 = find_top_and_worst_posts(aggregated_data)
-    
-    print("Saving top 3 thumbnails to local...")
-    media_ids = []
-    for media_data in top_3.to_numpy():
-        media_ids.append(media_data[0])
-        
-    print(media_ids)
-    save_images_to_local_via_media_id(cl, media_ids)
-
-    print("\nTop 3 Posts:")
-    print(top_3)
-    print("\nWorst 3 Posts:")
-    print(worst_3)
-
-    # Plot Post IDs vs Sentiment Scores with thumbnails
-    plot_graph_with_thumbnails(aggregated_data, cl)
-    
-    
-
-# Run the program
-if __name__ == "__main__":
-    main()
+import pandas as pd
+# Figures are built on their own Agg canvas instead of through pyplot, whose global
+# state is not thread-safe; analysis jobs render on several worker threads at once
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.image import imsave
+from matplotlib.offsetbox import OffsetImage, AnnotationBbox
+import numpy 
+import hashlib
+import json
+import os
+import shutil
+import threading
+from prompt import give_prediction_on_the_next_post
+from aggregation import aggregate_scores
+from thumbnails import ThumbnailCache, evict_lru
+from ranking import extreme_positions
+
+# On-screen width of a thumbnail on the graph, in pixels
+THUMBNAIL_DISPLAY_PX = 54
+
+GRAPH_PATH = os.path.join("static", "graph_with_thumbnails.png")
+GRAPH_CACHE_DIR = "graph_cache"
+# Cached renders past this size are evicted, least recently used first
+GRAPH_CACHE_BYTES = 50 * 1024 * 1024
+
+# Find top 3 and worst 3 posts
+def find_top_and_worst_posts(aggregated_data, k=3):
+    """
+    Finds the top 3 and worst 3 posts based on aggregate sentiment scores.
+    Same rows and order as sorting by score and taking head(k) / tail(k), but picked
+    with two bounded heaps instead of a full sort.
+    """
+    top, bottom = extreme_positions(aggregated_data['Aggregate_Score'].to_numpy(), k)
+    top_3 = aggregated_data.iloc[top]
+    worst_3 = aggregated_data.iloc[bottom]
+    return top_3, worst_3
+
+# Shrink a thumbnail to roughly its on-screen size
+def shrink_thumbnail(img):
+    """
+    Strides the array down to about THUMBNAIL_DISPLAY_PX wide so matplotlib does not
+    resample the full image on every render.
+    """
+    step = max(1, img.shape[1] // THUMBNAIL_DISPLAY_PX)
+    return numpy.ascontiguousarray(img[::step, ::step])
+
+# Cache key for a rendered graph
+def graph_key(aggregated_data, images):
+    """
+    Hashes the aggregated scores and the thumbnails drawn on them.
+    """
+    digest = hashlib.sha256()
+    for media_id, score in zip(aggregated_data['media_id'], aggregated_data['Aggregate_Score']):
+        digest.update(f"{media_id}\0{float(score)!r}\0".encode("utf-8"))
+        img = images.get(media_id)
+        if img is not None:
+            digest.update(repr(img.shape).encode("utf-8"))
+            digest.update(img.tobytes())
+    return digest.hexdigest()
+
+# Lightweight series for client-side charts
+def graph_series(aggregated_data, thumbnails=None):
+    """
+    Returns the graph data as a JSON-serialisable dict, so the front end can draw
+    the chart itself instead of fetching a server-rendered PNG.
+    """
+    media_ids = [str(media_id) for media_id in aggregated_data['media_id']]
+    series = {
+        'media_id': media_ids,
+        'Aggregate_Score': [float(score) for score in aggregated_data['Aggregate_Score']],
+    }
+    if thumbnails is not None:
+        series['thumbnail_url'] = [thumbnails.thumbnail_url(media_id) for media_id in aggregated_data['media_id']]
+        series['thumbnail_url'] = [str(url) if url else None for url in series['thumbnail_url']]
+    return series
+
+def save_graph_series(aggregated_data, path, thumbnails=None):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(graph_series(aggregated_data, thumbnails), file)
+    return path
+
+# Plot graph with thumbnails
+def plot_graph_with_thumbnails(aggregated_data, cl, thumbnails=None, output_path=GRAPH_PATH):
+    """
+    Plots Post IDs vs Aggregate Sentiment Scores with thumbnails displayed at graph points.
+    Pass the run's ThumbnailCache to reuse thumbnails already fetched for the top posts.
+    Renders are cached by a hash of the scores and thumbnails; when nothing changed the
+    cached PNG is copied to output_path without touching matplotlib.
+    """
+    if thumbnails is None:
+        thumbnails = ThumbnailCache(cl)
+    images = {
+        media_id: shrink_thumbnail(img)
+        for media_id, img in thumbnails.get(list(aggregated_data['media_id'])).items()
+    }
+
+    os.makedirs(GRAPH_CACHE_DIR, exist_ok=True)
+    cached_path = os.path.join(GRAPH_CACHE_DIR, graph_key(aggregated_data, images) + ".png")
+    try:
+        shutil.copyfile(cached_path, output_path)
+        os.utime(cached_path)  # mark as recently used for eviction
+        print("Graph unchanged, reusing cached render...")
+        return output_path
+    except OSError:
+        pass  # not cached, or evicted by another run
+
+    fig = Figure(figsize=(12, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+
+    # Plot the sentiment scores
+    ax.scatter(aggregated_data['media_id'], aggregated_data['Aggregate_Score'], color='blue', s=100)
+    ax.set_title('Post Sentiment Analysis', fontsize=16)
+    ax.set_xlabel('Media ID', fontsize=12)
+    ax.set_ylabel('Aggregate Sentiment Score', fontsize=12)
+
+    # Add thumbnails to graph points
+    for i, (media_id, score) in enumerate(zip(aggregated_data['media_id'], aggregated_data['Aggregate_Score'])):
+        img = images.get(media_id)
+        if img is not None:
+            try:
+                imagebox = OffsetImage(img, zoom=THUMBNAIL_DISPLAY_PX / img.shape[1])
+                ab = AnnotationBbox(imagebox, (i, score), frameon=False)
+                ax.add_artist(ab)
+            except Exception as e:
+                print(f"Error displaying thumbnail for media_id {media_id}: {e}")
+    
+
+    ax.tick_params(axis='x', labelrotation=90)
+    fig.tight_layout()
+    print("Saving graph with thumbnails...")
+    fig.savefig(output_path)
+    # Copied then renamed, so a concurrent run never reuses a half-written render
+    partial = f"{cached_path}.{threading.get_ident()}.part"
+    shutil.copyfile(output_path, partial)
+    os.replace(partial, cached_path)
+    evict_lru(GRAPH_CACHE_DIR, GRAPH_CACHE_BYTES)
+    return output_path
+
+def save_images_to_local_via_media_id(cl, media_ids, thumbnails=None, output_dir="static"):
+    if thumbnails is None:
+        thumbnails = ThumbnailCache(cl)
+    images = thumbnails.get(media_ids)
+    i=3
+    for media_id in media_ids:
+        img = images.get(media_id)
+        if img is not None:
+            try:
+                imsave(os.path.join(output_dir, f"top_{i}.jpg"), img)
+                i=i-1
+            except Exception as e:
+                print(f"Error saving thumbnail for media_id {media_id}: {e}")
+
+# Main function
+def main():
+    
+
+    # Load processed sentiment data
+    data = pd.read_csv('processed_comments.csv')
+
+    # Aggregate sentiment scores
+    aggregated_data = aggregate_scores(data)
+
+    # Find the top 3 and worst 3 posts
+    top_3, worst_3 = find_top_and_worst_posts(aggregated_data)
+    
+    print("Saving top 3 thumbnails to local...")
+    media_ids = []
+    for media_data in top_3.to_numpy():
+        media_ids.append(media_data[0])
+        
+    print(media_ids)
+    save_images_to_local_via_media_id(cl, media_ids)
+
+    print("\nTop 3 Posts:")
+    print(top_3)
+    print("\nWorst 3 Posts:")
+    print(worst_3)
+
+    # Plot Post IDs vs Sentiment Scores with thumbnails
+    plot_graph_with_thumbnails(aggregated_data, cl)
+    
+    
+
+# Run the program
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+RESULTS_DIR = "results"
+# Files of a finished job published with a version, under content-hashed names
+RESULT_FILES = ("graph_with_thumbnails.png", "graph_series.json", "top_1.jpg", "top_2.jpg", "top_3.jpg")
+
+_version_pattern = re.compile(r"[0-9a-f]{32}")
+
+
+# Version of an account's results
+def result_version(username, aggregated_data, *parts):
+    """
+    Hashes the account, its aggregated scores and any extra parts (pipeline version,
+    settings that change the output). Scores are rounded first, so float noise
+    between runs does not count as a change.
+    """
+    digest = hashlib.sha256(str(username).encode("utf-8"))
+    for part in parts:
+        digest.update(f"\0{part}".encode("utf-8"))
+    digest.update(aggregated_data.round(9).to_csv(index=False).encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+# Immutable, versioned snapshots of analysis results
+class ResultStore:
+    """
+    Keeps each result version in its own directory under RESULTS_DIR: the graph and
+    top-post images under content-hashed names (top_1.<hash>.jpg) plus a
+    manifest.json with the values of the results page. Version directories are never
+    modified once written, so their files can be cached by browsers indefinitely.
+    A small pointer file per account records its latest version.
+    """
+
+    def __init__(self, directory=RESULTS_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "accounts"), exist_ok=True)
+
+    def path(self, version):
+        return os.path.join(self.directory, version)
+
+    def _account_path(self, username):
+        name = hashlib.sha256(str(username).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, "accounts", name + ".json")
+
+    def get(self, version):
+        """
+        Returns the manifest of version, or None if it was never published.
+        """
+        if not _version_pattern.fullmatch(str(version)):
+            return None
+        try:
+            with open(os.path.join(self.path(version), "manifest.json"), encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def latest(self, username):
+        try:
+            with open(self._account_path(username), encoding="utf-8") as file:
+                return self.get(json.load(file)["version"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def point(self, username, version):
+        """
+        Records version as the latest one of username.
+        """
+        path = self._account_path(username)
+        partial = f"{path}.{threading.get_ident()}.part"
+        with self._lock:
+            with open(partial, "w", encoding="utf-8") as file:
+                json.dump({"version": version, "updated_at": time.time()}, file)
+            os.replace(partial, path)
+
+    def publish(self, username, version, workspace, values, job_id=None):
+        """
+        Copies the result files of workspace into version's directory and records it
+        as the latest version of username. Returns the manifest; if the version was
+        already published, the existing one is kept.
+        """
+        manifest = self.get(version)
+        if manifest is None:
+            # Assembled next to the target and renamed, so readers never see half a version
+            staging = f"{self.path(version)}.{threading.get_ident()}.part"
+            os.makedirs(staging, exist_ok=True)
+            files = {}
+            for name in RESULT_FILES:
+                source = os.path.join(workspace, name)
+                if not os.path.exists(source):
+                    continue
+                stem, extension = os.path.splitext(name)
+                files[name] = f"{stem}.{_file_digest(source)}{extension}"
+                shutil.copyfile(source, os.path.join(staging, files[name]))
+            manifest = {"version": version, "job_id": job_id, "created_at": time.time(),
+                        "files": files, "values": values}
+            with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as file:
+                json.dump(manifest, file)
+            try:
+                os.rename(staging, self.path(version))
+            except OSError:
+                # Another job published the same version first
+                shutil.rmtree(staging, ignore_errors=True)
+                manifest = self.get(version) or manifest
+        self.point(username, version)
+        return manifest
@@ -0,0 +1,105 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+
+# Persistent cache of preprocessing and sentiment results
+class ScoreCache:
+    """
+    Content-addressed SQLite cache of (Cleaned_Comment, Sentiment_Score). The class is
+    not stored: it depends on the thresholds, so callers derive it from the score.
+    Keys are a hash of the pipeline version plus the raw comment text, so bumping the
+    version invalidates every entry. The least recently used rows are evicted once
+    the table grows past max_entries.
+    """
+
+    def __init__(self, path="score_cache.sqlite3", version="1", max_entries=500000):
+        self.path = path
+        self.version = str(version)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            "key TEXT PRIMARY KEY, cleaned TEXT, score REAL, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS scores_last_used ON scores (last_used)")
+        self._conn.commit()
+
+    def key(self, text):
+        """
+        Returns the cache key for a raw comment.
+        """
+        payload = f"{self.version}\0{text}".encode("utf-8", "surrogatepass")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get_many(self, texts):
+        """
+        Looks up raw comments and returns {text: (cleaned, score)} for the hits.
+        """
+        keys = {self.key(text): text for text in texts}
+        found = {}
+        with self._lock:
+            key_list = list(keys)
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, cleaned, score FROM scores WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, cleaned, score in rows:
+                    found[keys[key]] = (cleaned, score)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE scores SET last_used = ? WHERE key = ?",
+                    [(now, self.key(text)) for text in found],
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, results):
+        """
+        Stores {text: (cleaned, score)} and evicts old rows if over capacity.
+        """
+        if not results:
+            return
+        now = time.time()
+        rows = [
+            (self.key(text), cleaned, float(score), now)
+            for text, (cleaned, score) in results.items()
+        ]
+        with self._lock:
+            # Column names keep caches created with the old class column usable
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO scores (key, cleaned, score, last_used) VALUES (?, ?, ?, ?)", rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """
+        Drops the least recently used rows beyond max_entries.
+        """
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM scores WHERE key IN (SELECT key FROM scores ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def stats(self):
+        """
+        Returns cumulative hit and miss counts.
+        """
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,144 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+
+THUMBNAIL_DIR = "thumbnail_cache"
+THUMBNAIL_MAX_SIDE = 512
+THUMBNAIL_CACHE_BYTES = 100 * 1024 * 1024
+DOWNLOAD_CONCURRENCY = 8
+
+# One pooled HTTP session shared by every download in the process
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=DOWNLOAD_CONCURRENCY, pool_maxsize=DOWNLOAD_CONCURRENCY))
+session.mount("http://", HTTPAdapter(pool_connections=DOWNLOAD_CONCURRENCY, pool_maxsize=DOWNLOAD_CONCURRENCY))
+_evict_lock = threading.Lock()
+
+
+# Function to keep a file cache directory under a size limit
+def evict_lru(directory, max_bytes):
+    """
+    Deletes the least recently used files of directory (oldest mtime first) until
+    it fits in max_bytes. Readers mark a hit with os.utime to keep the file.
+    """
+    with _evict_lock:
+        entries = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+# Thumbnails for one analysis run, backed by a shared on-disk cache
+class ThumbnailCache:
+    """
+    Resolves each media ID's thumbnail URL at most once per run (cl.media_info),
+    downloads missing thumbnails concurrently over the pooled session, and keeps
+    decoded, downscaled RGB arrays on disk. The least recently used files are evicted
+    once the directory grows past max_bytes, so repeat analyses of the same account
+    need no image fetches at all.
+    """
+
+    def __init__(self, cl, directory=THUMBNAIL_DIR, max_side=THUMBNAIL_MAX_SIDE,
+                 max_bytes=THUMBNAIL_CACHE_BYTES, concurrency=DOWNLOAD_CONCURRENCY):
+        self.cl = cl
+        self.directory = directory
+        self.max_side = max_side
+        self.max_bytes = max_bytes
+        self.concurrency = concurrency
+        self._urls = {}
+        self._images = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, media_id):
+        name = hashlib.sha1(f"{media_id}:{self.max_side}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{name}.npy")
+
+    def thumbnail_url(self, media_id):
+        """
+        Returns the thumbnail URL for a media ID, calling cl.media_info only once per run.
+        """
+        if media_id not in self._urls:
+            try:
+                self._urls[media_id] = self.cl.media_info(media_id).thumbnail_url
+            except Exception as e:
+                print(f"Error fetching thumbnail for media_id {media_id}: {e}")
+                self._urls[media_id] = None
+        return self._urls[media_id]
+
+    def _load(self, media_id):
+        path = self._path(media_id)
+        try:
+            image = np.load(path)
+            os.utime(path)  # mark as recently used for eviction
+        except (OSError, ValueError):
+            # Missing, unreadable, or evicted by another run between the two calls
+            return None
+        return image
+
+    def _download(self, media_id):
+        url = self.thumbnail_url(media_id)
+        if not url:
+            return None
+        try:
+            response = session.get(str(url), timeout=10)
+            response.raise_for_status()
+            image = Image.open(BytesIO(response.content)).convert("RGB")
+            image.thumbnail((self.max_side, self.max_side))
+            array = np.asarray(image)
+            # Write then rename, so a concurrent run never loads a half-written file
+            path = self._path(media_id)
+            partial = f"{path}.{threading.get_ident()}.part"
+            with open(partial, "wb") as file:
+                np.save(file, array)
+            os.replace(partial, path)
+            return array
+        except Exception as e:
+            print(f"Error downloading thumbnail for media_id {media_id}: {e}")
+            return None
+
+    def get(self, media_ids):
+        """
+        Returns {media_id: RGB uint8 array} for every media ID whose thumbnail is available.
+        """
+        missing = []
+        for media_id in dict.fromkeys(media_ids):
+            if media_id in self._images:
+                continue
+            image = self._load(media_id)
+            if image is None:
+                missing.append(media_id)
+            else:
+                self._images[media_id] = image
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                for media_id, image in zip(missing, pool.map(self._download, missing)):
+                    if image is not None:
+                        self._images[media_id] = image
+            self.evict()
+
+        return {media_id: self._images[media_id] for media_id in media_ids if media_id in self._images}
+
+    def evict(self):
+        """
+        Deletes the least recently used cache files until the directory fits in max_bytes.
+        """
+        evict_lru(self.directory, self.max_bytes)